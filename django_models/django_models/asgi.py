@@ -7,10 +7,28 @@ For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
 
+import asyncio
 import os
+import threading
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_models.settings')
+# Serve the read-only catalog views from relationship_app.async_views
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Build resolvers, templates and caches now rather than on the first requests
+from relationship_app.warmup import warm_up  # noqa: E402
+
+try:
+    asyncio.get_running_loop()
+except RuntimeError:
+    warm_up()
+else:
+    # Servers such as uvicorn import the application inside their event loop,
+    # where Django refuses database access; warm up from a worker thread
+    warmup_thread = threading.Thread(target=warm_up, name='warm-up')
+    warmup_thread.start()
+    warmup_thread.join()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'relationship_app.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware', 
+    'relationship_app.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,7 +57,8 @@ ROOT_URLCONF = 'django_models.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates plus render timing for RequestTimingMiddleware
+        'BACKEND': 'relationship_app.template_backends.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -62,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'relationship_app.context_processors.user_role',
             ],
         },
     },
@@ -80,6 +85,100 @@ DATABASES = {
     }
 }
 
+# Pragmas applied to every new SQLite connection (relationship_app.sqlite_profile):
+# 5s busy timeout, 64 MiB page cache, 256 MiB mmap, in-memory temp storage, and
+# synchronous=NORMAL once the database is in WAL mode. Override single values
+# here, or set one to None to keep SQLite's own default. WAL is stored in the
+# database file: switch it once with "manage.py optimize_database --wal" at
+# deploy, and run "manage.py optimize_database" from cron to keep planner
+# statistics current. Write paths begin with BEGIN IMMEDIATE through
+# sqlite_profile.write_transaction(); other transactions stay DEFERRED.
+SQLITE_PRAGMAS = {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# Permission snapshots and catalog caches are stored here. Set DJANGO_REDIS_URL
+# to share them between worker processes; permission snapshots and catalog
+# pages stay off with the process-local default (see relationship_app.permissions
+# and relationship_app.page_cache).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'django_models',
+    }
+}
+
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['DJANGO_REDIS_URL'],
+    }
+
+
+# Logging
+# https://docs.djangoproject.com/en/6.0/topics/logging/
+# relationship_app.timing writes one JSON line per request (RequestTimingMiddleware)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'relationship_app.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'relationship_app.warmup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Catalog page cache (relationship_app.page_cache): entries live in the
+# default cache for PAGE_CACHE_TIMEOUT seconds, fronted by a per-process LRU.
+# Pages are only cached with a shared default cache (see CACHES above).
+PAGE_CACHE_TIMEOUT = 600
+PAGE_CACHE_LOCAL_ENTRIES = 256
+
+# Per-row card fragments (relationship_app.fragments), versioned by updated_at
+FRAGMENT_CACHE_TIMEOUT = 3600
+
+
+# Worker warm-up (relationship_app.warmup, run from wsgi.py/asgi.py).
+# Set DJANGO_WARMUP_PREFILL=1 to also render the first catalog pages into
+# the caches before the worker accepts traffic.
+
+WARMUP_PREFILL_CACHES = os.environ.get('DJANGO_WARMUP_PREFILL') == '1'
+
+
+# Route the read-only catalog views and dashboards to their async versions
+# (relationship_app.async_views). asgi.py sets DJANGO_ASYNC_VIEWS=1 unless it
+# is already set; under WSGI the sync views avoid an event loop per request.
+
+ASYNC_CATALOG_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+
+
+# Metrics
+# Served at /metrics/ in the Prometheus text format. With several worker
+# processes, point METRICS_MULTIPROC_DIR at a directory they share (cleared
+# on deploy) so any worker can report the totals of all of them.
+
+METRICS_MULTIPROC_DIR = os.environ.get('DJANGO_METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+
+# Addresses allowed to scrape (loopback only by default); None allows every client
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -128,6 +227,8 @@ LOGIN_REDIRECT_URL = '/'
 # Redirect after logout
 LOGOUT_REDIRECT_URL = '/'
 # Authentication settings
+# ProfileBackend loads User and UserProfile in one joined query per request
+AUTHENTICATION_BACKENDS = ['relationship_app.backends.ProfileBackend']
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
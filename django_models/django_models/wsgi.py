@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_models.settings')
 
 application = get_wsgi_application()
+
+# Build resolvers, templates and caches now rather than on the first requests
+from relationship_app.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -1,9 +1,10 @@
 ﻿from django.contrib import admin
+from .export import export_response
 from .models import Author, Book, Library, Librarian, UserProfile
 
 @admin.register(Author)
 class AuthorAdmin(admin.ModelAdmin):
-    list_display = ['name']
+    list_display = ['name', 'book_count']
     search_fields = ['name']
 
 @admin.register(Book)
@@ -11,12 +12,34 @@ class BookAdmin(admin.ModelAdmin):
     list_display = ['title', 'author']
     list_filter = ['author']
     search_fields = ['title']
+    actions = ['export_csv', 'export_jsonl']
+
+    @admin.action(description='Export selected books as CSV')
+    def export_csv(self, request, queryset):
+        return export_response('csv', books=queryset, filename='books')
+
+    @admin.action(description='Export selected books as JSONL')
+    def export_jsonl(self, request, queryset):
+        return export_response('jsonl', books=queryset, filename='books')
 
 @admin.register(Library)
 class LibraryAdmin(admin.ModelAdmin):
-    list_display = ['name']
+    list_display = ['name', 'book_count', 'author_count']
     filter_horizontal = ['books']
     search_fields = ['name']
+    actions = ['export_csv', 'export_jsonl']
+
+    def _export(self, fmt, queryset):
+        library_ids = list(queryset.values_list('id', flat=True))
+        return export_response(fmt, library_ids=library_ids, filename='holdings')
+
+    @admin.action(description='Export holdings of selected libraries as CSV')
+    def export_csv(self, request, queryset):
+        return self._export('csv', queryset)
+
+    @admin.action(description='Export holdings of selected libraries as JSONL')
+    def export_jsonl(self, request, queryset):
+        return self._export('jsonl', queryset)
 
 @admin.register(Librarian)
 class LibrarianAdmin(admin.ModelAdmin):
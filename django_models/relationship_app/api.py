@@ -0,0 +1,184 @@
+"""
+Read-only JSON API for books, authors, libraries and holdings.
+
+Lists are keyset-paginated on id (?cursor=, ?per_page=); a cursor that does
+not decode to valid ids answers 400 {"error": "Invalid cursor"}. Every endpoint
+answers conditional GETs through django.views.decorators.http.condition,
+with validators read from the indexed updated_at columns. A 304 therefore
+costs one small query and no serialization. Collections send only an
+ETag, built from the newest updated_at and the total kept in CatalogStats
+(so that deletions change it without a COUNT over the table). Single
+objects also send Last-Modified.
+"""
+
+from django.db.models import F, Subquery
+from django.http import Http404, JsonResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_safe
+
+from .budgets import query_budget
+from .models import Author, Book, CatalogStats, Library, Librarian
+from .pagination import InvalidCursor, KeysetPaginator, get_page_size
+from .stats import STATS_PK
+
+API_ORDERING = ('id',)
+
+
+def _stamp(value):
+    return f'{value.timestamp():.6f}' if value else '0'
+
+
+# === VALIDATORS ===
+
+def _collection_etag(model, total_field):
+    def etag(request, *args, **kwargs):
+        # One query: the stats row's total plus the newest updated_at (read off its index)
+        newest = model.objects.order_by('-updated_at').values_list('updated_at', flat=True)
+        state = (CatalogStats.objects.filter(pk=STATS_PK)
+                 .values(total=F(total_field), last=Subquery(newest[:1])).first())
+        if state is None:
+            # No stats row yet (see stats.get_catalog_stats): the newest stamp alone
+            state = {'total': '', 'last': newest.first()}
+        return f'{model._meta.model_name}s-{state["total"]}-{_stamp(state["last"])}'
+    return etag
+
+
+def _row_updated_at(model, request, pk):
+    """updated_at of one row (None if it does not exist), queried once per request"""
+    if not hasattr(request, '_api_updated_at'):
+        request._api_updated_at = model.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return request._api_updated_at
+
+
+def _row_conditions(model, pk_kwarg):
+    def etag(request, *args, **kwargs):
+        updated_at = _row_updated_at(model, request, kwargs[pk_kwarg])
+        if updated_at is None:
+            return None
+        return f'{model._meta.model_name}-{kwargs[pk_kwarg]}-{_stamp(updated_at)}'
+
+    def last_modified(request, *args, **kwargs):
+        return _row_updated_at(model, request, kwargs[pk_kwarg])
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+# === SERIALIZATION ===
+
+def _book(book):
+    return {
+        'id': book.id,
+        'title': book.title,
+        'author': {'id': book.author_id, 'name': book.author.name},
+        'updated_at': book.updated_at.isoformat(),
+    }
+
+
+def _author(author):
+    return {
+        'id': author.id,
+        'name': author.name,
+        'book_count': author.book_count,
+        'updated_at': author.updated_at.isoformat(),
+    }
+
+
+def _library(library):
+    try:
+        librarian = library.librarian.name
+    except Librarian.DoesNotExist:
+        librarian = None
+    return {
+        'id': library.id,
+        'name': library.name,
+        'librarian': librarian,
+        'book_count': library.book_count,
+        'author_count': library.author_count,
+        'updated_at': library.updated_at.isoformat(),
+    }
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{urlencode(sorted(params.items()))}'
+
+
+def _page_response(request, queryset, serialize):
+    paginator = KeysetPaginator(queryset, ordering=API_ORDERING, per_page=get_page_size(request))
+    try:
+        # page() fetches the rows, so a cursor the database rejects fails here too
+        page = paginator.page(request.GET.get('cursor'))
+    except (InvalidCursor, OverflowError):
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({
+        'results': [serialize(obj) for obj in page],
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+
+
+# === VIEWS ===
+
+@query_budget(2)
+@require_safe
+@condition(etag_func=_collection_etag(Book, 'total_books'))
+def book_list(request):
+    return _page_response(request, Book.objects.select_related('author'), _book)
+
+
+@query_budget(3)
+@require_safe
+@_row_conditions(Book, 'book_id')
+def book_detail(request, book_id):
+    if request._api_updated_at is None:
+        raise Http404("No Book matches the given query.")
+    book = Book.objects.with_library_details().get(pk=book_id)
+    data = _book(book)
+    data['libraries'] = [{'id': library.id, 'name': library.name} for library in book.holding_libraries]
+    return JsonResponse(data)
+
+
+@query_budget(2)
+@require_safe
+@condition(etag_func=_collection_etag(Author, 'total_authors'))
+def author_list(request):
+    return _page_response(request, Author.objects.all(), _author)
+
+
+@query_budget(2)
+@require_safe
+@_row_conditions(Author, 'author_id')
+def author_detail(request, author_id):
+    if request._api_updated_at is None:
+        raise Http404("No Author matches the given query.")
+    return JsonResponse(_author(Author.objects.get(pk=author_id)))
+
+
+@query_budget(2)
+@require_safe
+@condition(etag_func=_collection_etag(Library, 'total_libraries'))
+def library_list(request):
+    return _page_response(request, Library.objects.with_listing_stats(), _library)
+
+
+@query_budget(2)
+@require_safe
+@_row_conditions(Library, 'pk')
+def library_detail(request, pk):
+    if request._api_updated_at is None:
+        raise Http404("No Library matches the given query.")
+    return JsonResponse(_library(Library.objects.with_listing_stats().get(pk=pk)))
+
+
+@query_budget(2)
+@require_safe
+@_row_conditions(Library, 'pk')
+def library_holdings(request, pk):
+    """Books held by a library; holding changes stamp the library's updated_at"""
+    if request._api_updated_at is None:
+        raise Http404("No Library matches the given query.")
+    books = Book.objects.filter(libraries=pk).select_related('author')
+    return _page_response(request, books, _book)
@@ -0,0 +1,147 @@
+"""
+Async versions of the read-only catalog views and dashboards.
+
+urls.py routes these instead of their views.py counterparts when
+settings.ASYNC_CATALOG_VIEWS is on, which asgi.py does by default. Each
+view resolves the user and role with aget_request_role() first, loads
+everything the template needs with the async ORM, and only then renders,
+so nothing blocks the event loop on the database and one worker can serve
+many slow clients at once. Templates, page keys and query budgets are the
+same as the sync views, so both paths share cached pages and cards.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import InvalidPage
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, render
+
+from .budgets import query_budget
+from .models import Book, Library
+from .page_cache import CATALOG_PERMISSIONS, cache_catalog_page
+from .pagination import KeysetPaginator, get_page_size
+from .roles import aget_request_role, role_required
+from .stats import get_catalog_stats
+
+
+async def _page(paginator, request):
+    try:
+        return await paginator.apage(request.GET.get('cursor'))
+    except InvalidPage:
+        raise Http404('Invalid page cursor')
+
+
+# === CATALOG VIEWS ===
+
+@query_budget(5)
+@cache_catalog_page(permissions=CATALOG_PERMISSIONS)
+async def list_books(request):
+    """Async views.list_books"""
+    await aget_request_role(request)
+    paginator = KeysetPaginator(Book.objects.select_related('author'),
+                                ordering=('title', 'id'), per_page=get_page_size(request))
+    page = await _page(paginator, request)
+    context = {
+        'books': page.object_list,
+        'page': page,
+        'user': request.user
+    }
+    return render(request, 'relationship_app/list_books.html', context)
+
+
+@query_budget(4)
+@cache_catalog_page()
+async def library_detail(request, pk):
+    """Async views.LibraryDetailView"""
+    await aget_request_role(request)
+    library = await aget_object_or_404(Library.objects.with_listing_stats(), pk=pk)
+    paginator = KeysetPaginator(library.books.select_related('author'), ordering=('title', 'id'),
+                                per_page=get_page_size(request))
+    page = await _page(paginator, request)
+    context = {
+        'object': library,
+        'library': library,
+        'books': page.object_list,
+        'page': page,
+    }
+    return render(request, 'relationship_app/library_detail.html', context)
+
+
+@query_budget(3)
+@cache_catalog_page()
+async def library_list(request):
+    """Async views.LibraryListView"""
+    await aget_request_role(request)
+    libraries = [library async for library in Library.objects.with_listing_stats().order_by('name', 'id')]
+    context = {
+        'object_list': libraries,
+        'libraries': libraries,
+    }
+    return render(request, 'relationship_app/library_list.html', context)
+
+
+@query_budget(4)
+@cache_catalog_page()
+async def book_detail(request, book_id):
+    """Async views.book_detail"""
+    await aget_request_role(request)
+    book = await aget_object_or_404(Book.objects.with_library_details(), id=book_id)
+    context = {
+        'book': book,
+        'libraries': book.holding_libraries,
+        'user': request.user
+    }
+    return render(request, 'relationship_app/book_detail.html', context)
+
+
+# === ROLE-BASED VIEWS ===
+
+@query_budget(3)
+@login_required(login_url="/login/")
+@role_required('admin')
+async def admin_view(request):
+    """Async views.admin_view"""
+    stats = await sync_to_async(get_catalog_stats)()
+    context = {
+        'user': request.user,
+        'role': 'Admin',
+        'total_users': stats.total_users,
+        'total_books': stats.total_books,
+        'total_libraries': stats.total_libraries,
+    }
+    return render(request, 'relationship_app/admin_view.html', context)
+
+
+@query_budget(4)
+@login_required(login_url="/login/")
+@role_required('librarian')
+async def librarian_view(request):
+    """Async views.librarian_view"""
+    libraries = [
+        library async for library in
+        Library.objects.with_listing_stats().filter(librarian__name=request.user.username)
+    ]
+    total = await Book.objects.filter(libraries__in=libraries).distinct().acount() if libraries else 0
+    context = {
+        'user': request.user,
+        'role': 'Librarian',
+        'libraries': libraries,
+        'total_books_in_charge': total,
+    }
+    return render(request, 'relationship_app/librarian_view.html', context)
+
+
+@query_budget(4)
+@login_required(login_url="/login/")
+@role_required('member')
+async def member_view(request):
+    """Async views.member_view"""
+    stats = await sync_to_async(get_catalog_stats)()
+    context = {
+        'user': request.user,
+        'role': 'Member',
+        'available_books': stats.total_books,
+        'available_libraries': stats.total_libraries,
+        'recent_books': [book async for book in Book.objects.select_related('author').order_by('-id')[:5]],
+    }
+    return render(request, 'relationship_app/member_view.html', context)
@@ -0,0 +1,55 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import metrics
+from .permissions import get_permission_snapshot
+
+
+class ProfileBackend(ModelBackend):
+    """ModelBackend that loads the user and their UserProfile in one joined query"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().authenticate(request, username=username, password=password, **kwargs)
+        finally:
+            metrics.observe_auth('authenticate', time.perf_counter() - started)
+
+    def get_user(self, user_id):
+        started = time.perf_counter()
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('profile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        finally:
+            metrics.observe_auth('get_user', time.perf_counter() - started)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        started = time.perf_counter()
+        UserModel = get_user_model()
+        try:
+            user = await UserModel._default_manager.select_related('profile').aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        finally:
+            metrics.observe_auth('get_user', time.perf_counter() - started)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        """Serve the permission set from the shared, versioned snapshot cache"""
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, '_perm_cache'):
+            user_obj._perm_cache = get_permission_snapshot(
+                user_obj, lambda: super(ProfileBackend, self).get_all_permissions(user_obj)
+            )
+        return user_obj._perm_cache
+
+    async def aget_all_permissions(self, user_obj, obj=None):
+        """Async get_all_permissions(), so async callers share the snapshot cache too"""
+        return await sync_to_async(self.get_all_permissions)(user_obj, obj)
@@ -0,0 +1,140 @@
+"""
+Helpers for exercising every relationship_app route in-process.
+
+Used by the benchmark_urls command to collect latency, SQL query counts and
+peak memory per route and role.
+"""
+
+import math
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+
+from .models import Book, Library
+
+APP_NAMESPACE = 'relationship_app'
+
+# Routes that change session state on GET and would spoil later measurements
+SKIP_ROUTES = {'logout'}
+
+# URL kwargs that refer to a Library rather than a Book
+LIBRARY_ROUTES = {'library_detail', 'api_library', 'api_library_holdings', 'bulk_holdings'}
+
+# URL kwargs that refer to the sample book's author
+AUTHOR_ROUTES = {'api_author'}
+
+# Query strings that make a route do representative work
+ROUTE_QUERY_STRINGS = {'search': 'q=river', 'search_api': 'q=river'}
+
+ROLES = ('anonymous', 'admin', 'librarian', 'member')
+
+# Presets for generate_dataset, from quick smoke runs to production scale
+DATASET_SIZES = {
+    'small': {'authors': 100, 'books': 1000, 'libraries': 5, 'holdings_density': 0.2},
+    'medium': {'authors': 2000, 'books': 50000, 'libraries': 20, 'holdings_density': 0.1},
+    'large': {'authors': 20000, 'books': 500000, 'libraries': 50, 'holdings_density': 0.05},
+}
+
+
+def _app_patterns():
+    resolver = get_resolver()
+    for pattern in resolver.namespace_dict[APP_NAMESPACE][1].url_patterns:
+        if isinstance(pattern, URLPattern) and pattern.name and pattern.name not in SKIP_ROUTES:
+            yield pattern
+
+
+def iter_routes():
+    """Yield (url name, [kwarg names]) for every named route in the app"""
+    for pattern in _app_patterns():
+        yield pattern.name, list(pattern.pattern.converters)
+
+
+def route_view(name):
+    """The view callable registered under a route name"""
+    for pattern in _app_patterns():
+        if pattern.name == name:
+            return pattern.callback
+    raise KeyError(name)
+
+
+def sample_url(name, kwarg_names, book_id, library_id):
+    """Reverse a route, filling every URL kwarg with a real object id"""
+    if name in LIBRARY_ROUTES:
+        target = library_id
+    elif name in AUTHOR_ROUTES:
+        target = Book.objects.filter(pk=book_id).values_list('author_id', flat=True).first() or 0
+    else:
+        target = book_id
+    url = reverse(f'{APP_NAMESPACE}:{name}', kwargs={kwarg: target for kwarg in kwarg_names})
+    if name in ROUTE_QUERY_STRINGS:
+        url = f'{url}?{ROUTE_QUERY_STRINGS[name]}'
+    return url
+
+
+def sample_ids():
+    """A representative book and library (the largest branch) to request"""
+    library = Library.objects.order_by('-book_count', 'id').first()
+    book = None
+    if library is not None:
+        book = library.books.order_by('id').first()
+    if book is None:
+        book = Book.objects.order_by('id').first()
+    return (book.pk if book else 0), (library.pk if library else 0)
+
+
+def client_for_role(role, username_prefix='bench_'):
+    """A test client logged in as the first generated user with the given role"""
+    client = Client(raise_request_exception=False)
+    if role != 'anonymous':
+        client.force_login(User.objects.get(username=f'{username_prefix}{role}_0'))
+    return client
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def measure(client, url, iterations=20, warmup=2):
+    """Request url repeatedly and summarize latency, query count and peak memory"""
+    for _ in range(warmup):
+        client.get(url)
+
+    latencies = []
+    queries = []
+    status = None
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(ctx.captured_queries))
+        status = response.status_code
+
+    # Memory is traced on a separate request because tracemalloc skews timings
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        client.get(url)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p90_ms': round(percentile(latencies, 90), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': max(queries),
+        'peak_kib': round(peak_bytes / 1024, 1),
+    }
@@ -0,0 +1,244 @@
+"""
+Comparing, merging and transferring library collections.
+
+When branches merge or close, holdings move between Library rows. The set
+operations here (union, intersection, difference) return Book querysets
+built from subqueries on the Library.books through table, so they can be
+counted, paged or exported without loading either collection.
+
+transfer_holdings() and merge_libraries() apply changes as INSERT ... SELECT
+(ignoring holdings the target already has) and DELETE statements on the
+through table, reassign the Librarian one-to-one, and then bring derived
+data up to date the way the signals would: holding counters and
+updated_at, the moved books' updated_at, and the catalog page cache
+version. Each call runs in a single transaction.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Count
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Now
+
+from .counters import CHUNK_SIZE, refresh_library_counts
+from .models import Book, Librarian, Library
+from .page_cache import bump_catalog_version
+from .sqlite_profile import write_transaction
+
+Holding = Library.books.through
+
+
+def _library_ids(libraries):
+    return [getattr(library, 'pk', library) for library in libraries]
+
+
+def _held_by(libraries):
+    """Subquery of the ids of books held by any of libraries"""
+    return Holding.objects.filter(library_id__in=_library_ids(libraries)).values('book_id')
+
+
+# === SET OPERATIONS ===
+
+def holdings_union(libraries):
+    """Books held by at least one of libraries"""
+    return Book.objects.filter(pk__in=_held_by(libraries))
+
+
+def holdings_intersection(libraries):
+    """Books held by every one of libraries"""
+    library_ids = set(_library_ids(libraries))
+    common = (Holding.objects.filter(library_id__in=library_ids).values('book_id')
+              .annotate(holders=Count('library_id')).filter(holders=len(library_ids))
+              .values('book_id'))
+    return Book.objects.filter(pk__in=common)
+
+
+def holdings_difference(libraries, others):
+    """Books held by any of libraries but by none of others"""
+    return holdings_union(libraries).exclude(pk__in=_held_by(others))
+
+
+@dataclass
+class CollectionComparison:
+    union: int
+    intersection: int
+    # library name -> books only that library holds
+    unique: dict
+
+
+def compare_libraries(libraries):
+    """Union, intersection and per-library unique counts, each computed in the database"""
+    libraries = list(libraries)
+    unique = {
+        library.name: holdings_difference([library], [other for other in libraries if other.pk != library.pk]).count()
+        for library in libraries
+    }
+    return CollectionComparison(
+        union=holdings_union(libraries).count(),
+        intersection=holdings_intersection(libraries).count(),
+        unique=unique,
+    )
+
+
+# === TRANSFERS AND MERGES ===
+
+@dataclass
+class TransferResult:
+    target: str
+    sources: list
+    dry_run: bool
+    added: int = 0
+    removed: int = 0
+    librarian: str = ''
+    displaced_librarian: str = ''
+    deleted_libraries: list = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    def summary(self):
+        verb = 'would move' if self.dry_run else 'moved'
+        parts = [f'{", ".join(self.sources)} -> {self.target}: {verb} {self.removed} holdings '
+                 f'({self.added} new to {self.target})']
+        if self.librarian:
+            parts.append(f'run by {self.librarian}')
+        if self.displaced_librarian:
+            parts.append(f'{self.displaced_librarian} takes over the vacated branch')
+        if self.deleted_libraries:
+            parts.append(f'{"would close" if self.dry_run else "closed"} {", ".join(self.deleted_libraries)}')
+        return '; '.join(parts) + f' ({self.elapsed_ms:.0f}ms)'
+
+
+def _move_holdings(source_ids, target, books=None):
+    """Copy the sources' holdings (of books, if given) to target, then drop them from the sources
+
+    Returns (holdings added to target, holdings removed from the sources).
+    """
+    selection = Holding.objects.filter(library_id__in=source_ids)
+    if books is not None:
+        selection = selection.filter(book_id__in=books.values('pk'))
+    moving = selection.values('book_id').distinct()
+
+    # Book details list their libraries; stamp them while the rows can still be found
+    Book.objects.filter(pk__in=moving).update(updated_at=Now())
+
+    qn = connection.ops.quote_name
+    table = qn(Holding._meta.db_table)
+    library_column = qn(Holding._meta.get_field('library').column)
+    book_column = qn(Holding._meta.get_field('book').column)
+    moving_sql, moving_params = moving.query.sql_with_params()
+    selection_sql, selection_params = selection.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {table} '
+            f'({library_column}, {book_column}) '
+            f'SELECT %s, moving.{book_column} FROM ({moving_sql}) moving '
+            f'{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None)}',
+            [target.pk, *moving_params],
+        )
+        added = cursor.rowcount
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {qn(Holding._meta.pk.column)} IN ({selection_sql})',
+            selection_params,
+        )
+        removed = cursor.rowcount
+    return added, removed
+
+
+def _assign_librarian(target, librarian):
+    """Make librarian run target; target's current librarian takes over librarian's old branch"""
+    current = Librarian.objects.filter(library=target).first()
+    if librarian is None or (current is not None and current.pk == librarian.pk):
+        return current, None
+    vacated_library_id = librarian.library_id
+    if current is not None:
+        # One-to-one: free the target before moving the new librarian in
+        Librarian.objects.filter(pk=current.pk).delete()
+    Librarian.objects.filter(pk=librarian.pk).update(library=target)
+    if current is not None:
+        Librarian.objects.create(pk=current.pk, name=current.name, library_id=vacated_library_id)
+    return librarian, current
+
+
+def transfer_holdings(source, target, books=None, dry_run=False):
+    """Move source's holdings of books (a Book queryset or ids; all when None) to target"""
+    if source.pk == target.pk:
+        raise ValueError('Source and target must be different libraries')
+    result = TransferResult(target=target.name, sources=[source.name], dry_run=dry_run)
+    if books is None or hasattr(books, 'query'):
+        selections = [books]
+    else:
+        # Keep IN (...) lists below SQLite's bound-parameter limit
+        book_ids = sorted(set(books))
+        selections = [Book.objects.filter(pk__in=book_ids[start:start + CHUNK_SIZE])
+                      for start in range(0, len(book_ids), CHUNK_SIZE)]
+
+    started = time.perf_counter()
+    with write_transaction(immediate=not dry_run):
+        for selection in selections:
+            if dry_run:
+                held = holdings_union([source]) if selection is None else holdings_union([source]).filter(
+                    pk__in=selection.values('pk'))
+                result.removed += held.count()
+                result.added += held.exclude(pk__in=_held_by([target])).count()
+            else:
+                added, removed = _move_holdings([source.pk], target, selection)
+                result.added += added
+                result.removed += removed
+        if not dry_run and result.removed:
+            refresh_library_counts([source.pk, target.pk])
+            bump_catalog_version()
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def merge_libraries(target, sources, librarian=None, delete_sources=False, dry_run=False):
+    """Merge every holding of sources into target, optionally closing the sources
+
+    librarian is the Librarian who runs target afterwards; by default target
+    keeps its own, or takes the first source's when it has none. A librarian
+    displaced from target takes over the chosen librarian's former branch, so
+    choosing a source's librarian while deleting the sources is refused: the
+    displaced librarian would be deleted along with that branch. Librarians
+    left on deleted sources are deleted with them.
+    """
+    sources = [source for source in sources if source.pk != target.pk]
+    if not sources:
+        raise ValueError('Give at least one source library other than the target')
+    source_ids = [source.pk for source in sources]
+    candidates = {lib.pk: lib for lib in Librarian.objects.filter(library_id__in=[target.pk, *source_ids])}
+    if librarian is None:
+        by_library = {lib.library_id: lib for lib in candidates.values()}
+        librarian = next((by_library[pk] for pk in [target.pk, *source_ids] if pk in by_library), None)
+    elif librarian.pk not in candidates:
+        raise ValueError(f'{librarian.name} does not run the target or one of the sources')
+    current = next((lib for lib in candidates.values() if lib.library_id == target.pk), None)
+    displacing = current is not None and librarian is not None and current.pk != librarian.pk
+    if displacing and delete_sources:
+        vacated = next(source.name for source in sources if source.pk == librarian.library_id)
+        raise ValueError(f'{current.name} would take over {vacated}, which is being closed; '
+                         f'move or remove {current.name} before merging')
+
+    result = TransferResult(target=target.name, sources=[source.name for source in sources], dry_run=dry_run)
+    started = time.perf_counter()
+    with write_transaction(immediate=not dry_run):
+        if dry_run:
+            result.added = holdings_difference(sources, [target]).count()
+            result.removed = Holding.objects.filter(library_id__in=source_ids).count()
+            result.librarian = librarian.name if librarian else ''
+            result.displaced_librarian = current.name if displacing else ''
+        else:
+            result.added, result.removed = _move_holdings(source_ids, target)
+            chosen, displaced = _assign_librarian(target, librarian)
+            result.librarian = chosen.name if chosen else ''
+            result.displaced_librarian = displaced.name if displaced else ''
+            if delete_sources:
+                Library.objects.filter(pk__in=source_ids).delete()
+                refresh_library_counts([target.pk])
+            else:
+                refresh_library_counts([target.pk, *source_ids])
+            bump_catalog_version()
+        if delete_sources:
+            result.deleted_libraries = [source.name for source in sources]
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
@@ -0,0 +1,25 @@
+"""
+Per-view SQL query budgets.
+
+Every routed view declares the most queries it may issue for one request,
+independent of how many rows are involved. Function views use the
+@query_budget decorator; class-based views set a `query_budget` attribute.
+QueryBudgetTests in tests.py renders each view at two data scales and fails
+when a view exceeds its budget or its query count grows with the data.
+"""
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL queries a view may issue per request"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_query_budget(view):
+    """Return the budget declared on a resolved view callable, or None"""
+    budget = getattr(view, 'query_budget', None)
+    if budget is None and hasattr(view, 'view_class'):
+        budget = getattr(view.view_class, 'query_budget', None)
+    return budget
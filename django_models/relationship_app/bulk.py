@@ -0,0 +1,301 @@
+"""
+Set-based bulk operations on many books at once.
+
+edit_titles(), reassign_author() and delete_books() take any number of book
+ids (a pasted weeding list, say) and apply one UPDATE or DELETE per batch of
+BATCH_SIZE ids, all inside a single transaction: every batch lands or none
+does. Model signals do not fire for set-based writes, so each operation
+then brings derived data up to date the way the bulk management commands
+do: author and holding counters, the search index, updated_at stamps, the
+catalog statistics and the page cache version.
+
+add_holdings() and remove_holdings() do the same for a library's
+holdings. They write the Library.books through table directly with
+INSERT ... SELECT (ignoring rows that already exist) and DELETE, without
+a duplicate check per call. Afterwards they send one m2m_changed
+notification covering every book that changed, so the usual receivers
+refresh counters, updated_at and the page cache once for the whole run.
+
+With dry_run=True nothing is written; the result describes what would
+change, batch by batch, with a sample of the affected rows. A progress
+callback, if given, is called after every batch.
+"""
+
+import re
+import time
+from dataclasses import asdict, dataclass, field
+
+from django.db import connection
+from django.db.models import Value
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Now, Replace
+from django.db.models.signals import m2m_changed
+
+from . import search, stats
+from .counters import CHUNK_SIZE, libraries_holding, refresh_author_counts, refresh_library_counts
+from .models import Book, Library
+from .page_cache import bump_catalog_version
+from .sqlite_profile import write_transaction
+
+BATCH_SIZE = CHUNK_SIZE
+PREVIEW_ROWS = 20
+MAX_BULK_IDS = 100000
+
+_ID_SEPARATORS = re.compile(r'[\s,;]+')
+
+
+def parse_book_ids(text):
+    """Book ids from free text separated by whitespace, commas or semicolons"""
+    ids = []
+    for token in _ID_SEPARATORS.split(text or ''):
+        if not token:
+            continue
+        if not token.isdigit():
+            raise ValueError(f'"{token}" is not a book id')
+        ids.append(int(token))
+    if len(ids) > MAX_BULK_IDS:
+        raise ValueError(f'At most {MAX_BULK_IDS} books can be changed at once')
+    return ids
+
+
+@dataclass
+class BulkBatch:
+    number: int
+    requested: int
+    matched: int
+    affected: int
+    ms: float
+
+
+@dataclass
+class BulkResult:
+    action: str
+    dry_run: bool
+    requested: int = 0
+    matched: int = 0
+    affected: int = 0
+    elapsed_ms: float = 0.0
+    batches: list = field(default_factory=list)
+    preview: list = field(default_factory=list)
+
+    @property
+    def missing(self):
+        return self.requested - self.matched
+
+    def summary(self):
+        verb = 'would change' if self.dry_run else 'changed'
+        return (f'{self.action}: {verb} {self.affected} of {self.matched} matching books '
+                f'({self.missing} not found) in {len(self.batches)} batches, {self.elapsed_ms:.0f}ms')
+
+    def as_dict(self):
+        return dict(asdict(self), missing=self.missing, summary=self.summary())
+
+
+def _run_batches(result, book_ids, handle_batch, progress):
+    ids = sorted(set(book_ids))
+    result.requested = len(ids)
+    for number, start in enumerate(range(0, len(ids), BATCH_SIZE), start=1):
+        chunk = ids[start:start + BATCH_SIZE]
+        started = time.perf_counter()
+        matched, affected = handle_batch(chunk)
+        batch = BulkBatch(number, len(chunk), matched, affected, (time.perf_counter() - started) * 1000)
+        result.batches.append(batch)
+        result.matched += matched
+        result.affected += affected
+        if progress is not None:
+            progress(result, batch)
+
+
+def _sample(result, rows):
+    room = PREVIEW_ROWS - len(result.preview)
+    if room > 0:
+        result.preview.extend(rows[:room])
+
+
+def _delete_where_in(table, column, ids):
+    """DELETE ... WHERE column IN (ids) without loading or signalling per row"""
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {connection.ops.quote_name(table)} '
+            f'WHERE {connection.ops.quote_name(column)} IN ({placeholders})',
+            ids,
+        )
+        return cursor.rowcount
+
+
+def edit_titles(book_ids, find, replace, dry_run=False, progress=None):
+    """Replace every occurrence of find with replace in the titles of the given books"""
+    if not find:
+        raise ValueError('Text to find is required')
+    result = BulkResult(action='Edit titles', dry_run=dry_run)
+    changed_ids = []
+
+    def handle_batch(chunk):
+        rows = list(Book.objects.filter(pk__in=chunk).values_list('pk', 'title'))
+        changed = [(pk, title) for pk, title in rows if find in title]
+        _sample(result, [{'id': pk, 'title': title, 'before': title, 'after': title.replace(find, replace)}
+                         for pk, title in changed])
+        ids = [pk for pk, _ in changed]
+        if ids and not dry_run:
+            Book.objects.filter(pk__in=ids).update(
+                title=Replace('title', Value(find), Value(replace)), updated_at=Now()
+            )
+            changed_ids.extend(ids)
+        return len(rows), len(ids)
+
+    started = time.perf_counter()
+    with write_transaction(immediate=not dry_run):
+        _run_batches(result, book_ids, handle_batch, progress)
+        if changed_ids:
+            search.index_books(changed_ids)
+            # Holding listings embed the title
+            Library.objects.filter(pk__in=libraries_holding(changed_ids)).update(updated_at=Now())
+            bump_catalog_version()
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def reassign_author(book_ids, author, dry_run=False, progress=None):
+    """Move the given books to author"""
+    result = BulkResult(action=f'Reassign to {author.name}', dry_run=dry_run)
+    changed_ids = []
+    previous_authors = set()
+
+    def handle_batch(chunk):
+        rows = list(Book.objects.filter(pk__in=chunk)
+                    .values_list('pk', 'title', 'author_id', 'author__name'))
+        changed = [row for row in rows if row[2] != author.pk]
+        _sample(result, [{'id': pk, 'title': title, 'before': name, 'after': author.name}
+                         for pk, title, _, name in changed])
+        ids = [row[0] for row in changed]
+        if ids and not dry_run:
+            Book.objects.filter(pk__in=ids).update(author_id=author.pk, updated_at=Now())
+            changed_ids.extend(ids)
+            previous_authors.update(row[2] for row in changed)
+        return len(rows), len(ids)
+
+    started = time.perf_counter()
+    with write_transaction(immediate=not dry_run):
+        _run_batches(result, book_ids, handle_batch, progress)
+        if changed_ids:
+            refresh_author_counts(previous_authors | {author.pk})
+            # Distinct-author counters change; the refresh also stamps updated_at
+            refresh_library_counts(libraries_holding(changed_ids))
+            search.index_books(changed_ids)
+            bump_catalog_version()
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def delete_books(book_ids, dry_run=False, progress=None):
+    """Delete the given books and their holdings"""
+    result = BulkResult(action='Delete', dry_run=dry_run)
+    authors = set()
+    libraries = set()
+    holdings = Library.books.through
+
+    def handle_batch(chunk):
+        rows = list(Book.objects.filter(pk__in=chunk)
+                    .values_list('pk', 'title', 'author_id', 'author__name'))
+        _sample(result, [{'id': pk, 'title': title, 'before': name, 'after': ''}
+                         for pk, title, _, name in rows])
+        ids = [row[0] for row in rows]
+        if ids and not dry_run:
+            authors.update(row[2] for row in rows)
+            libraries.update(libraries_holding(ids))
+            _delete_where_in(holdings._meta.db_table, holdings._meta.get_field('book').column, ids)
+            _delete_where_in(Book._meta.db_table, Book._meta.pk.column, ids)
+            search.remove_books(ids)
+        return len(rows), len(ids)
+
+    started = time.perf_counter()
+    with write_transaction(immediate=not dry_run):
+        _run_batches(result, book_ids, handle_batch, progress)
+        if result.affected and not dry_run:
+            refresh_author_counts(authors)
+            refresh_library_counts(libraries)
+            stats.adjust('total_books', -result.affected)
+            bump_catalog_version()
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def _write_holdings(sql, params, book_column):
+    """Run an INSERT or DELETE on the through table; return (row count, changed book ids or None)"""
+    returning = connection.features.can_return_columns_from_insert
+    if returning:
+        sql += f' RETURNING {book_column}'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        if returning:
+            book_ids = {row[0] for row in cursor.fetchall()}
+            return len(book_ids), book_ids
+        return cursor.rowcount, None
+
+
+def _holding_columns():
+    holdings = Library.books.through
+    qn = connection.ops.quote_name
+    return (qn(holdings._meta.db_table), qn(holdings._meta.get_field('library').column),
+            qn(holdings._meta.get_field('book').column))
+
+
+def _held(library, book_ids):
+    return set(Library.books.through.objects.filter(library_id=library.pk, book_id__in=book_ids)
+               .values_list('book_id', flat=True))
+
+
+def _change_holdings(library, book_ids, adding, dry_run, progress):
+    verb = 'Add to' if adding else 'Remove from'
+    result = BulkResult(action=f'{verb} {library.name}', dry_run=dry_run)
+    changed_ids = set()
+    table, library_column, book_column = _holding_columns()
+
+    def handle_batch(chunk):
+        if dry_run:
+            books = list(Book.objects.filter(pk__in=chunk).values_list('pk', 'title'))
+            held = _held(library, chunk)
+            changing = [(pk, title) for pk, title in books if (pk in held) != adding]
+            _sample(result, [{'id': pk, 'title': title, 'before': '' if adding else library.name,
+                              'after': library.name if adding else ''} for pk, title in changing])
+            return len(books), len(changing)
+        ids = list(Book.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+        if not ids:
+            return 0, 0
+        placeholders = ', '.join(['%s'] * len(ids))
+        if adding:
+            book_table = connection.ops.quote_name(Book._meta.db_table)
+            pk_column = connection.ops.quote_name(Book._meta.pk.column)
+            sql = (f'{connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)} {table} '
+                   f'({library_column}, {book_column}) '
+                   f'SELECT %s, {pk_column} FROM {book_table} WHERE {pk_column} IN ({placeholders}) '
+                   f'{connection.ops.on_conflict_suffix_sql([], OnConflict.IGNORE, None, None)}')
+        else:
+            sql = f'DELETE FROM {table} WHERE {library_column} = %s AND {book_column} IN ({placeholders})'
+        count, book_ids = _write_holdings(sql, [library.pk, *ids], book_column)
+        # Without RETURNING, notify for every requested book; receivers are idempotent
+        changed_ids.update(ids if book_ids is None else book_ids)
+        return len(ids), count
+
+    started = time.perf_counter()
+    with write_transaction(immediate=not dry_run):
+        _run_batches(result, book_ids, handle_batch, progress)
+        if changed_ids:
+            m2m_changed.send(
+                sender=Library.books.through, instance=library,
+                action='post_add' if adding else 'post_remove', reverse=False,
+                model=Book, pk_set=changed_ids, using=connection.alias,
+            )
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
+
+
+def add_holdings(library, book_ids, dry_run=False, progress=None):
+    """Add the given books to library, skipping unknown ids and books it already holds"""
+    return _change_holdings(library, book_ids, True, dry_run, progress)
+
+
+def remove_holdings(library, book_ids, dry_run=False, progress=None):
+    """Remove the given books from library's holdings"""
+    return _change_holdings(library, book_ids, False, dry_run, progress)
@@ -0,0 +1,6 @@
+from .roles import get_request_role
+
+
+def user_role(request):
+    """Expose the request-scoped role to templates as `user_role`"""
+    return {'user_role': get_request_role(request)}
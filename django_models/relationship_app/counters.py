@@ -0,0 +1,74 @@
+"""
+Denormalized holding counters.
+
+Library.book_count, Library.author_count and Author.book_count are kept in
+step by the signal handlers in signals.py. Each refresh recomputes the
+affected rows exactly with one correlated-subquery UPDATE, so counters
+cannot drift under concurrent edits the way +1/-1 arithmetic can. The same
+UPDATE stamps updated_at, since the counters are part of the row.
+"""
+
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Now
+
+from .models import Author, Book, Library
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _library_count_expressions():
+    holdings = Library.books.through.objects.filter(library_id=OuterRef('pk')).values('library_id')
+    book_count = holdings.annotate(n=Count('book_id')).values('n')
+    author_count = holdings.annotate(n=Count('book__author_id', distinct=True)).values('n')
+    return {
+        'book_count': Coalesce(Subquery(book_count), Value(0)),
+        'author_count': Coalesce(Subquery(author_count), Value(0)),
+        'updated_at': Now(),
+    }
+
+
+def _author_count_expressions():
+    books = Book.objects.filter(author_id=OuterRef('pk')).values('author_id')
+    return {
+        'book_count': Coalesce(Subquery(books.annotate(n=Count('id')).values('n')), Value(0)),
+        'updated_at': Now(),
+    }
+
+
+def refresh_library_counts(library_ids=None):
+    """Recompute book/author counters for the given libraries (all when None)"""
+    if library_ids is None:
+        return Library.objects.update(**_library_count_expressions())
+    updated = 0
+    for chunk in _chunks(library_ids):
+        updated += Library.objects.filter(pk__in=chunk).update(**_library_count_expressions())
+    return updated
+
+
+def refresh_author_counts(author_ids=None):
+    """Recompute book counters for the given authors (all when None)"""
+    if author_ids is None:
+        return Author.objects.update(**_author_count_expressions())
+    updated = 0
+    for chunk in _chunks(author_ids):
+        updated += Author.objects.filter(pk__in=chunk).update(**_author_count_expressions())
+    return updated
+
+
+def libraries_holding(book_ids):
+    """Ids of libraries that hold any of the given books"""
+    through = Library.books.through
+    library_ids = set()
+    for chunk in _chunks(book_ids):
+        library_ids.update(
+            through.objects.filter(book_id__in=chunk)
+            .values_list('library_id', flat=True).distinct()
+        )
+    return library_ids
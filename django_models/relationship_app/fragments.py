@@ -0,0 +1,51 @@
+"""
+Versioned fragment cache for per-row cards.
+
+Each card is cached under its template, the vary-on values (e.g. the
+permission flags that toggle its buttons), the object id, and the object's
+updated_at. updated_at moves whenever the row's rendering can change: on
+save, on holding changes through the counter refreshes, and on author or
+librarian edits (see signals.py). Stale cards are therefore never looked
+up again and simply expire.
+
+A page fetches all of its cards with one get_many, renders only the
+misses from the surrounding template context, and stores them with one
+set_many.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from . import metrics
+
+
+def card_key(template_name, vary_hash, obj):
+    version = f'{obj.updated_at.timestamp():.6f}' if obj.updated_at else '0'
+    return f'relationship_app:card:{template_name}:{vary_hash}:{obj.pk}:{version}'
+
+
+def render_cards(context, objects, template_name, vary_on=()):
+    """Return one rendered card per object, in order, reusing cached HTML where possible"""
+    objects = list(objects)
+    if not objects:
+        return []
+    vary_hash = hashlib.md5(repr(tuple(vary_on)).encode('utf-8')).hexdigest()
+    keys = [card_key(template_name, vary_hash, obj) for obj in objects]
+    cached = cache.get_many(keys)
+    metrics.record_cache('fragments', True, len(cached))
+    metrics.record_cache('fragments', False, len(keys) - len(cached))
+
+    missing = {}
+    if len(cached) < len(keys):
+        template = context.template.engine.get_template(template_name)
+        name = objects[0]._meta.model_name
+        for key, obj in zip(keys, objects):
+            if key not in cached:
+                with context.push({name: obj}):
+                    missing[key] = template.render(context)
+        cache.set_many(missing, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+
+    return [mark_safe(cached.get(key, missing.get(key))) for key in keys]
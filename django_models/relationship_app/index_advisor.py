@@ -0,0 +1,282 @@
+"""
+Find the queries behind the views and admin changelists that SQLite cannot
+answer from an index.
+
+capture_statements() requests every named route as every role (the sample
+URLs benchmark_urls uses) and every admin changelist of this app, plain,
+searched, filtered on each list_filter and sorted on each column, and
+records each distinct SELECT with its parameters and the pages that ran it.
+advise() runs EXPLAIN QUERY PLAN on each one and flags plan steps that scan
+a whole table or build a temporary B-tree for ORDER BY, GROUP BY or
+DISTINCT, with the index that would avoid it. Only SQLite plans are
+understood.
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.contrib import admin
+from django.db import connection
+from django.test import RequestFactory
+from django.urls import reverse
+
+from . import benchmark
+
+APP_LABEL = 'relationship_app'
+
+# Search term for admin changelists with search_fields
+SEARCH_TERM = 'river'
+
+# Scans of tables smaller than this are reported as harmless
+SMALL_TABLE_ROWS = 1000
+
+# SQLite plan steps: a table scan without an index, any loop, a sort
+_SCAN = re.compile(r'^SCAN (\w+)$')
+_LOOP = re.compile(r'^(?:SCAN|SEARCH) (\w+)')
+_TEMP_BTREE = re.compile(r'USE TEMP B-TREE FOR (.+)$')
+
+# Pieces of the SQL Django generates: quoted "table"."column" or U0."column" references
+_ALIAS = re.compile(r'"(\w+)" (U\d+)\b')
+_COLUMN = re.compile(r'"?(\w+)"?\."(\w+)"')
+_LIKE = re.compile(r'"?(\w+)"?\."(\w+)" LIKE ')
+_ORDER_BY = re.compile(r'\sORDER BY\s(.+?)(?:\sLIMIT\s.*)?$', re.S)
+_ORDER_TERM = re.compile(r'"?(\w+)"?\."(\w+)"\s+(ASC|DESC)')
+
+
+@dataclass
+class Statement:
+    sql: str
+    params: tuple
+    sources: set = field(default_factory=set)
+
+
+@dataclass
+class Finding:
+    table: str
+    problems: set
+    rows: int
+    suggestion: str
+    statements: list = field(default_factory=list)
+
+    @property
+    def harmless(self):
+        return self.rows < SMALL_TABLE_ROWS
+
+    @property
+    def sources(self):
+        return sorted({source for statement in self.statements for source in statement.sources})
+
+
+class _Recorder:
+    """execute_wrapper that keeps every distinct SELECT and where it came from"""
+
+    def __init__(self):
+        self.source = ''
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == 'SELECT':
+            statement = self.statements.setdefault(sql, Statement(sql, tuple(params or ())))
+            statement.sources.add(self.source)
+        return execute(sql, params, many, context)
+
+
+def _changelist_urls(client_user):
+    """Changelist URLs for this app's admin pages: plain, searched, filtered and sorted"""
+    factory = RequestFactory()
+    for model, model_admin in admin.site._registry.items():
+        if model._meta.app_label != APP_LABEL:
+            continue
+        url = reverse(f'admin:{APP_LABEL}_{model._meta.model_name}_changelist')
+        yield url
+        if model_admin.search_fields:
+            yield f'{url}?q={SEARCH_TERM}'
+        request = factory.get(url)
+        request.user = client_user
+        changelist = model_admin.get_changelist_instance(request)
+        for spec in changelist.filter_specs:
+            choice = next((choice for choice in spec.choices(changelist) if not choice['selected']), None)
+            if choice is not None:
+                yield f'{url}{choice["query_string"]}'
+        for position in range(1, len(model_admin.get_list_display(request)) + 1):
+            yield f'{url}?o={position}'
+
+
+def capture_statements(roles=benchmark.ROLES):
+    """Request every route and admin changelist; return the distinct SELECTs they ran"""
+    recorder = _Recorder()
+    book_id, library_id = benchmark.sample_ids()
+    with connection.execute_wrapper(recorder):
+        for role in roles:
+            client = benchmark.client_for_role(role)
+            for name, kwarg_names in benchmark.iter_routes():
+                url = benchmark.sample_url(name, kwarg_names, book_id, library_id)
+                recorder.source = f'{url} ({role})'
+                client.get(url)
+        if 'admin' in roles:
+            client = benchmark.client_for_role('admin')
+            user = client.get(reverse(f'{benchmark.APP_NAMESPACE}:list_books')).wsgi_request.user
+            for url in _changelist_urls(user):
+                recorder.source = f'{url} (admin)'
+                client.get(url)
+    return list(recorder.statements.values())
+
+
+def explain(sql, params=()):
+    """SQLite's EXPLAIN QUERY PLAN detail lines for a statement"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _models_by_table():
+    return {model._meta.db_table: model for model in apps.get_models(include_auto_created=True)}
+
+
+def _names(table, alias):
+    return {table, alias} - {None}
+
+
+def _where(sql):
+    where = sql.split(' WHERE ', 1)
+    if len(where) == 1:
+        return ''
+    return re.split(r'\s(?:GROUP BY|ORDER BY|LIMIT)\s', where[1], maxsplit=1)[0]
+
+
+def _order_by(sql):
+    """[(table or alias, column, descending)] of the outermost ORDER BY"""
+    match = _ORDER_BY.search(sql)
+    if not match:
+        return []
+    return [(owner, column, direction == 'DESC')
+            for owner, column, direction in _ORDER_TERM.findall(match.group(1))]
+
+
+def _filter_columns(model, table, alias, sql):
+    """Columns of table compared in the WHERE clause, and those only matched with LIKE"""
+    where = _where(sql)
+    names = _names(table, alias)
+    like = {column for owner, column in _LIKE.findall(where) if owner in names}
+    columns = []
+    for owner, column in _COLUMN.findall(where):
+        if owner in names and column not in like and column not in columns:
+            columns.append(column)
+    pk_column = model._meta.pk.column if model else None
+    return [column for column in columns if column != pk_column], like
+
+
+def _index_fields(model, terms):
+    """Index fields for columns (with descending flags), led by an ascending column"""
+    by_column = {f.column: f.name for f in model._meta.concrete_fields}
+    flip = terms[0][1]
+    return [('-' if descending != flip else '') + by_column.get(column, column) for column, descending in terms]
+
+
+def _existing_index(table, fields, model):
+    """Name of an index whose leading columns already match fields, if any"""
+    by_name = {f.name: f.column for f in model._meta.concrete_fields}
+    wanted = [(by_name.get(name.lstrip('-'), name.lstrip('-')), name.startswith('-')) for name in fields]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    for name, constraint in constraints.items():
+        if not constraint['index'] or constraint['columns'] is None:
+            continue
+        orders = constraint.get('orders') or ['ASC'] * len(constraint['columns'])
+        present = [(column, order == 'DESC') for column, order in zip(constraint['columns'], orders)]
+        flipped = [(column, not descending) for column, descending in present]
+        if wanted == present[:len(wanted)] or wanted == flipped[:len(wanted)]:
+            return name
+    return None
+
+
+def _suggest(model, table, alias, sql, problems):
+    """What to do about the flagged steps on one table, or None when they are harmless"""
+    if model is None:
+        return None
+    columns, like = _filter_columns(model, table, alias, sql)
+    pk_column = model._meta.pk.column
+    terms = [(column, descending) for owner, column, descending in _order_by(sql)
+             if owner in _names(table, alias)]
+    sorting = any('order by' in problem for problem in problems)
+    if columns:
+        # Equality columns first, then the sort key so the index also returns rows in order
+        extra = [term for term in terms if sorting and term[0] not in columns and term[0] != pk_column]
+        fields = _index_fields(model, [(column, False) for column in columns] + extra)
+    elif sorting and terms and terms[0][0] != pk_column:
+        fields = _index_fields(model, terms)
+    elif like:
+        return 'LIKE with a leading wildcard cannot use a B-tree index; search through relationship_app.search instead'
+    elif re.search(r'\sLIMIT\s', sql) or not any(problem == 'full scan' for problem in problems):
+        # A scan in rowid order that LIMIT stops early, or a sort an index cannot avoid
+        return None
+    else:
+        return 'reads every row: nothing filters this table'
+    existing = _existing_index(table, fields, model)
+    if existing and 'full scan' in problems:
+        return f'{existing} already covers {fields!r} but the planner scanned anyway; run ANALYZE'
+    if existing:
+        return (f'{existing} already covers {fields!r}; rows arrive through a join or for several '
+                'filter values, so the sort stays (its cost is bounded by the filtered rows)')
+    return f'{model._meta.label}: models.Index(fields={fields!r})'
+
+
+def _aliases(sql):
+    """Table for each alias Django gave a subquery table ("relationship_app_book" U0)"""
+    return {alias: table for table, alias in _ALIAS.findall(sql)}
+
+
+def _flagged_steps(plan, sql, models):
+    """{(table, alias): [problems]} for the scans and sorts in a plan"""
+    aliases = _aliases(sql)
+    flagged = {}
+
+    def flag(name, problem):
+        table = aliases.get(name, name)
+        if table in models:
+            flagged.setdefault((table, name if name != table else None), []).append(problem)
+
+    outer = next((match.group(1) for match in map(_LOOP.match, plan) if match), None)
+    for step in plan:
+        scan = _SCAN.match(step)
+        if scan:
+            flag(scan.group(1), 'full scan')
+        temp = _TEMP_BTREE.search(step)
+        if temp:
+            purpose = temp.group(1).lower()
+            order_by = _order_by(sql)
+            # A sort belongs to the table that owns the sort key; DISTINCT and
+            # GROUP BY to the table the outermost loop reads
+            owner = order_by[0][0] if 'order by' in purpose and order_by else outer
+            if owner:
+                flag(owner, f'temp B-tree for {purpose}')
+    return flagged
+
+
+def _row_count(table, cache):
+    if table not in cache:
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            cache[table] = cursor.fetchone()[0]
+    return cache[table]
+
+
+def advise(statements):
+    """Explain every statement and group the flagged plan steps into findings"""
+    models = _models_by_table()
+    row_counts = {}
+    findings = {}
+    for statement in statements:
+        plan = explain(statement.sql, statement.params)
+        flagged = _flagged_steps(plan, statement.sql, models)
+        for (table, alias), problems in flagged.items():
+            suggestion = _suggest(models[table], table, alias, statement.sql, problems)
+            if suggestion is None:
+                continue
+            finding = findings.setdefault(
+                (table, suggestion), Finding(table, set(), _row_count(table, row_counts), suggestion)
+            )
+            finding.problems.update(problems)
+            finding.statements.append(statement)
+    return sorted(findings.values(), key=lambda finding: (-finding.rows, finding.table, finding.suggestion))
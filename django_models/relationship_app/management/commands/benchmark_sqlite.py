@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from relationship_app import sqlite_profile
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare read/write throughput of the rollback-journal defaults and the production '
+        'SQLite profile. Reader threads page through the catalog while writer threads stamp '
+        'books, on a scratch copy of the database, so the real file is never written.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=int, default=10, help='Run time per profile (default: 10)')
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--output', help='Also write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('benchmark_sqlite needs a file-backed SQLite database')
+        path = str(connection.settings_dict['NAME'])
+        production = {'journal_mode': sqlite_profile.JOURNAL_MODE, **sqlite_profile.get_pragmas()}
+        profiles = {'rollback': sqlite_profile.ROLLBACK_PRAGMAS, 'production': production}
+
+        results = {}
+        for name, pragmas in profiles.items():
+            self.stdout.write(f'Running {name} profile for {options["seconds"]}s...')
+            results[name] = sqlite_profile.measure_throughput(
+                path, pragmas, seconds=options['seconds'],
+                readers=options['readers'], writers=options['writers'],
+            )
+            for kind in ('read', 'write'):
+                stats = results[name][kind]
+                self.stdout.write(
+                    f'  {kind:>5}: {stats["ops_per_s"]:>8.1f}/s  p50={stats["p50_ms"]}ms '
+                    f'p99={stats["p99_ms"]}ms  locked={stats["errors"]}'
+                )
+
+        for kind in ('read', 'write'):
+            before, after = results['rollback'][kind]['ops_per_s'], results['production'][kind]['ops_per_s']
+            change = f'{after / before:.1f}x' if before else 'n/a'
+            self.stdout.write(self.style.SUCCESS(f'{kind} throughput: {before}/s -> {after}/s ({change})'))
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(json.dumps(results, indent=2) + '\n')
@@ -0,0 +1,105 @@
+import io
+import json
+import logging
+import platform
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from relationship_app import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Run every named relationship_app route in-process, as each role, against '
+        'generated datasets, and write latency/query/memory results as JSON. '
+        'Uses a throwaway test database unless --current-db is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small',
+                            help=f'Comma-separated dataset presets: {", ".join(benchmark.DATASET_SIZES)} '
+                                 '(default: small)')
+        parser.add_argument('--roles', default=','.join(benchmark.ROLES),
+                            help='Comma-separated roles to request as (default: all)')
+        parser.add_argument('--routes', default='',
+                            help='Comma-separated URL names to limit the run to (default: all)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark-results.json',
+                            help='Where to write the JSON results (- for stdout)')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Benchmark the data already in the configured database instead of generating it')
+
+    def handle(self, *args, **options):
+        sizes = [size for size in options['sizes'].split(',') if size]
+        unknown = set(sizes) - set(benchmark.DATASET_SIZES)
+        if unknown and not options['current_db']:
+            raise CommandError(f'Unknown dataset size(s): {", ".join(sorted(unknown))}')
+        roles = [role for role in options['roles'].split(',') if role]
+        routes = {route for route in options['routes'].split(',') if route}
+
+        # 4xx/5xx responses are expected for some roles, and per-request timing
+        # lines would drown the report; keep both out of the output
+        quiet_loggers = [logging.getLogger(name) for name in ('django.request', 'relationship_app.timing')]
+        old_levels = [logger.level for logger in quiet_loggers]
+        for logger in quiet_loggers:
+            logger.setLevel(logging.CRITICAL)
+        setup_test_environment()
+        old_config = None
+        if not options['current_db']:
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            results = []
+            for size in (['current'] if options['current_db'] else sizes):
+                if not options['current_db']:
+                    self.stdout.write(f'Generating {size} dataset...')
+                    call_command('generate_dataset', clear=True, interactive=False, seed=options['seed'],
+                                 stdout=io.StringIO(), **benchmark.DATASET_SIZES[size])
+                results.extend(self._run(size, roles, routes, options))
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            for logger, level in zip(quiet_loggers, old_levels):
+                logger.setLevel(level)
+
+        report = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+            },
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(payload)
+        else:
+            with open(options['output'], 'w') as handle:
+                handle.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(results)} results to {options["output"]}'))
+
+    def _run(self, size, roles, routes, options):
+        book_id, library_id = benchmark.sample_ids()
+        results = []
+        for role in roles:
+            client = benchmark.client_for_role(role)
+            for name, kwarg_names in benchmark.iter_routes():
+                if routes and name not in routes:
+                    continue
+                url = benchmark.sample_url(name, kwarg_names, book_id, library_id)
+                stats = benchmark.measure(client, url, options['iterations'], options['warmup'])
+                results.append(dict(dataset=size, route=name, role=role, url=url, **stats))
+                self.stdout.write(
+                    f'{size:>7} {role:>9} {name:<22} {stats["status"]} '
+                    f'p50={stats["p50_ms"]:.1f}ms p99={stats["p99_ms"]:.1f}ms '
+                    f'q={stats["queries"]} peak={stats["peak_kib"]:.0f}KiB'
+                )
+        return results
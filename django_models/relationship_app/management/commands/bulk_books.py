@@ -0,0 +1,69 @@
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relationship_app import bulk
+from relationship_app.models import Author
+
+
+class Command(BaseCommand):
+    help = (
+        'Edit titles of, reassign or delete many books listed by id, in one transaction of '
+        'set-based statements. Ids are read from a file (or - for stdin), separated by '
+        'whitespace, commas or semicolons.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['edit', 'reassign', 'delete'])
+        parser.add_argument('path', help='File listing book ids, or - for stdin')
+        parser.add_argument('--find', help='edit: text to find in titles')
+        parser.add_argument('--replace', default='', help='edit: replacement text (default: remove)')
+        parser.add_argument('--author', type=int, help='reassign: id of the new author')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+
+    def handle(self, *args, **options):
+        try:
+            book_ids = bulk.parse_book_ids(self._read(options['path']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if not book_ids:
+            raise CommandError('No book ids given')
+
+        action = options['action']
+        kwargs = {'dry_run': options['dry_run'], 'progress': self._progress}
+        try:
+            if action == 'edit':
+                result = bulk.edit_titles(book_ids, options['find'], options['replace'], **kwargs)
+            elif action == 'reassign':
+                if options['author'] is None:
+                    raise CommandError('reassign needs --author')
+                try:
+                    author = Author.objects.get(pk=options['author'])
+                except Author.DoesNotExist:
+                    raise CommandError(f'Author {options["author"]} not found')
+                result = bulk.reassign_author(book_ids, author, **kwargs)
+            else:
+                result = bulk.delete_books(book_ids, **kwargs)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        for row in result.preview:
+            self.stdout.write(f'  {row["id"]}: {row["title"]}  {row["before"]} -> {row["after"]}')
+        self.stdout.write(self.style.SUCCESS(result.summary()))
+
+    def _read(self, path):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8').read()
+        try:
+            with open(path, encoding='utf-8') as handle:
+                return handle.read()
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+
+    def _progress(self, result, batch):
+        self.stdout.write(
+            f'batch {batch.number}: {batch.matched}/{batch.requested} found, '
+            f'{batch.affected} {"to change" if result.dry_run else "changed"} ({batch.ms:.1f}ms)'
+        )
@@ -0,0 +1,45 @@
+from django.core.management.base import CommandError
+
+from relationship_app import bulk
+from relationship_app.models import Library
+
+from .bulk_books import Command as BulkBooksCommand
+
+
+class Command(BulkBooksCommand):
+    help = (
+        "Add or remove many books in a library's holdings in one transaction, writing the "
+        'through table in batches. Ids are read from a file (or - for stdin), separated by '
+        'whitespace, commas or semicolons.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['add', 'remove'])
+        parser.add_argument('library', help='Library id or exact name')
+        parser.add_argument('path', help='File listing book ids, or - for stdin')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without writing anything')
+
+    def handle(self, *args, **options):
+        library = self._library(options['library'])
+        try:
+            book_ids = bulk.parse_book_ids(self._read(options['path']))
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if not book_ids:
+            raise CommandError('No book ids given')
+
+        operation = bulk.add_holdings if options['action'] == 'add' else bulk.remove_holdings
+        result = operation(library, book_ids, dry_run=options['dry_run'], progress=self._progress)
+        for row in result.preview:
+            self.stdout.write(f'  {row["id"]}: {row["title"]}')
+        self.stdout.write(self.style.SUCCESS(result.summary()))
+
+    def _library(self, value):
+        lookup = {'pk': int(value)} if value.isdigit() else {'name': value}
+        try:
+            return Library.objects.get(**lookup)
+        except Library.DoesNotExist:
+            raise CommandError(f'Library {value} not found')
+        except Library.MultipleObjectsReturned:
+            raise CommandError(f'More than one library is named {value}; use its id')
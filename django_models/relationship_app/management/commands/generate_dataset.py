@@ -0,0 +1,211 @@
+import bisect
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from relationship_app import search
+from relationship_app.counters import refresh_author_counts, refresh_library_counts
+from relationship_app.models import Author, Book, Library, Librarian, UserProfile
+from relationship_app.page_cache import bump_catalog_version
+from relationship_app.permissions import bump_permissions_version
+from relationship_app.stats import refresh_catalog_stats
+
+USERNAME_PREFIX = 'bench_'
+ROLE_GROUPS = {'admin': 'Admins', 'librarian': 'Librarians', 'member': 'Members'}
+
+FIRST_NAMES = ['Ana', 'Bjørn', 'Chloé', 'Dmitri', 'Eun-ji', 'François', 'Grace', 'Hiroshi',
+               'Ingrid', 'José', 'Kwame', 'Léa', 'Mateo', 'Nadia', 'Oskar', 'Zoë']
+LAST_NAMES = ['Álvarez', 'Brown', 'Chen', 'Dubois', 'Eriksson', 'García', 'Håkansson', 'Ivanova',
+              'Jones', 'Kowalski', 'Müller', 'Nakamura', 'Okafor', 'Petrov', 'Rossi', 'Smith']
+TITLE_WORDS = ['Shadow', 'River', 'Garden', 'Empire', 'Silence', 'Café', 'Winter', 'Memory',
+               'Voyage', 'Crown', 'Forêt', 'Glass', 'Harbor', 'Night', 'Orchard', 'Storm',
+               'Letters', 'Machine', 'Island', 'Señor', 'Promise', 'Archive', 'Mirror', 'Fire']
+
+
+def zipf_cum_weights(n, s):
+    """Cumulative Zipf(s) weights for ranks 1..n (s=0 gives a uniform distribution)"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def zipf_choice(rng, cum_weights):
+    return bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic, reproducible catalog of configurable size for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--books', type=int, default=10000)
+        parser.add_argument('--libraries', type=int, default=20)
+        parser.add_argument('--holdings-density', type=float, default=0.1,
+                            help='Average fraction of the catalog held by each library (default: 0.1)')
+        parser.add_argument('--author-skew', type=float, default=1.1,
+                            help='Zipf exponent for books per author; 0 = uniform (default: 1.1)')
+        parser.add_argument('--library-skew', type=float, default=0.8,
+                            help='Zipf exponent for holdings per library; 0 = uniform (default: 0.8)')
+        parser.add_argument('--admins', type=int, default=1)
+        parser.add_argument('--librarians', type=int, default=5)
+        parser.add_argument('--members', type=int, default=50)
+        parser.add_argument('--password',
+                            help='Password for every generated user (default: unusable, so nobody '
+                                 'can log in with one; benchmark clients log in without it)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the ENTIRE existing catalog (not only generated data) and '
+                                 'previously generated users first')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation before --clear when DEBUG is off')
+
+    def handle(self, *args, **options):
+        if options['authors'] < 1 and options['books'] > 0:
+            raise CommandError('--authors must be at least 1 when generating books')
+        if not 0 <= options['holdings_density'] <= 1:
+            raise CommandError('--holdings-density must be between 0 and 1')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        if options['clear']:
+            self._confirm_clear(options['interactive'])
+            self._step('Clearing existing data', self._clear)
+
+        author_ids = self._step('Authors', self._create_authors, options['authors'])
+        book_ids = self._step('Books', self._create_books, author_ids,
+                              options['books'], options['author_skew'])
+        library_ids = self._step('Libraries', self._create_libraries, options['libraries'])
+        self._step('Holdings', self._create_holdings, library_ids, book_ids,
+                   options['holdings_density'], options['library_skew'])
+        self._step('Users', self._create_users, library_ids, options)
+
+        # Bulk inserts skip signals, so rebuild derived data in one pass each
+        self._step('Counters', lambda: (refresh_author_counts(), refresh_library_counts()))
+        self._step('Search index', search.rebuild_index)
+        self._step('Catalog stats', refresh_catalog_stats)
+        bump_permissions_version()
+        bump_catalog_version()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Dataset generated in {elapsed:.1f}s'))
+
+    def _step(self, label, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        count = f' ({len(result):,})' if isinstance(result, list) else ''
+        self.stdout.write(f'{label}{count}: {time.perf_counter() - started:.1f}s')
+        return result
+
+    def _bulk(self, model, objects):
+        """bulk_create from a generator in batches; returns the new primary keys"""
+        ids = []
+        iterator = iter(objects)
+        while True:
+            batch = list(itertools.islice(iterator, self.batch_size))
+            if not batch:
+                return ids
+            with transaction.atomic():
+                ids.extend(obj.pk for obj in model.objects.bulk_create(batch))
+
+    def _confirm_clear(self, interactive):
+        """Refuse to wipe a non-DEBUG database without an explicit yes"""
+        if settings.DEBUG or not interactive:
+            return
+        answer = input(
+            f'--clear deletes every library, book, author, librarian and holding in '
+            f'{connection.settings_dict["NAME"]}, and DEBUG is off.\n'
+            "Type 'yes' to continue, or 'no' to cancel: "
+        )
+        if answer != 'yes':
+            raise CommandError('Clear cancelled')
+
+    def _clear(self):
+        # Plain DELETEs: going through the ORM would load every row to send signals
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (Library.books.through, Librarian, Library, Book, Author):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    def _create_authors(self, count):
+        rng = self.rng
+        return self._bulk(Author, (
+            Author(name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}')
+            for i in range(count)
+        ))
+
+    def _create_books(self, author_ids, count, skew):
+        rng = self.rng
+        weights = zipf_cum_weights(len(author_ids), skew) if count else []
+        return self._bulk(Book, (
+            Book(
+                title=' '.join(rng.sample(TITLE_WORDS, rng.randint(1, 3))) + f' {i}',
+                author_id=author_ids[zipf_choice(rng, weights)],
+            )
+            for i in range(count)
+        ))
+
+    def _create_libraries(self, count):
+        return self._bulk(Library, (Library(name=f'Branch {i:04d}') for i in range(count)))
+
+    def _create_holdings(self, library_ids, book_ids, density, skew):
+        if not library_ids or not book_ids:
+            return
+        rng = self.rng
+        total = round(density * len(book_ids) * len(library_ids))
+        weights = [1.0 / (rank ** skew) for rank in range(1, len(library_ids) + 1)]
+        scale = total / sum(weights)
+        # Through rows have no signals or defaults to honour, so skip model instances entirely
+        table = connection.ops.quote_name(Library.books.through._meta.db_table)
+        sql = f'INSERT INTO {table} (library_id, book_id) VALUES (%s, %s)'
+        written = 0
+        for library_id, weight in zip(library_ids, weights):
+            size = min(len(book_ids), round(weight * scale))
+            picks = rng.sample(book_ids, size)
+            for start in range(0, size, self.batch_size):
+                rows = [(library_id, book_id) for book_id in picks[start:start + self.batch_size]]
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+            written += size
+        self.stdout.write(f'  {written:,} holdings')
+
+    def _create_users(self, library_ids, options):
+        # Hash once and reuse for every user; no --password gives an unusable one
+        password = make_password(options['password'])
+        roles = [('admin', options['admins']), ('librarian', options['librarians']),
+                 ('member', options['members'])]
+        usernames = [(f'{USERNAME_PREFIX}{role}_{i}', role) for role, count in roles for i in range(count)]
+        if User.objects.filter(username__in=[name for name, _ in usernames]).exists():
+            raise CommandError('Generated users already exist; rerun with --clear')
+
+        user_ids = self._bulk(User, (
+            User(username=name, password=password, is_staff=(role != 'member'),
+                 is_superuser=(role == 'admin'))
+            for name, role in usernames
+        ))
+        self._bulk(UserProfile, (
+            UserProfile(user_id=user_id, role=role)
+            for user_id, (_, role) in zip(user_ids, usernames)
+        ))
+
+        groups = {role: Group.objects.get_or_create(name=name)[0] for role, name in ROLE_GROUPS.items()}
+        Membership = User.groups.through
+        self._bulk(Membership, (
+            Membership(user_id=user_id, group_id=groups[role].pk)
+            for user_id, (_, role) in zip(user_ids, usernames)
+        ))
+
+        # Hand out libraries round-robin so every librarian manages some branches
+        librarian_names = [name for name, role in usernames if role == 'librarian']
+        if librarian_names:
+            self._bulk(Librarian, (
+                Librarian(name=librarian_names[i % len(librarian_names)], library_id=library_id)
+                for i, library_id in enumerate(library_ids)
+            ))
+        return user_ids
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relationship_app import search
+from relationship_app.counters import refresh_author_counts, refresh_library_counts
+from relationship_app.models import Author, Book, Library
+from relationship_app.page_cache import bump_catalog_version
+from relationship_app.sqlite_profile import write_transaction
+from relationship_app.stats import refresh_catalog_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a catalog file (CSV or JSONL) into Author/Book/Library in batches. '
+        'Each record needs "title" and "author"; an optional "libraries" field '
+        '(list in JSONL, separator-joined string in CSV) adds holdings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Records written per transaction (default: 5000)')
+        parser.add_argument('--library-separator', default=';',
+                            help='Separator for the CSV "libraries" column (default: ;)')
+        parser.add_argument('--progress-every', type=int, default=100000,
+                            help='Report throughput every N records (default: 100000)')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        self.library_separator = options['library_separator']
+
+        # name -> id maps so each author/library is looked up or created only once
+        self.author_ids = dict(Author.objects.values_list('name', 'id').iterator())
+        self.library_ids = dict(Library.objects.values_list('name', 'id').iterator())
+        self.touched_authors = set()
+        self.touched_libraries = set()
+        self.new_book_ids = []
+
+        started = time.perf_counter()
+        total = 0
+        next_report = options['progress_every']
+        batch = []
+        try:
+            with self._open(options['path']) as handle:
+                for record in self._records(handle, fmt):
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        total += self._write_batch(batch)
+                        batch = []
+                        if total >= next_report:
+                            self._report(total, started)
+                            next_report += options['progress_every']
+                if batch:
+                    total += self._write_batch(batch)
+        finally:
+            # Batches commit as they go, so a bad record later on still leaves
+            # books behind; per-row signals were skipped for those too
+            if self.new_book_ids:
+                self._refresh_derived_data()
+
+        self._report(total, started, final=True)
+
+    def _refresh_derived_data(self):
+        """Bring counters, the search index, stats and the page cache up to date in bulk"""
+        refresh_author_counts(self.touched_authors)
+        refresh_library_counts(self.touched_libraries)
+        search.index_books(self.new_book_ids)
+        refresh_catalog_stats()
+        bump_catalog_version()
+
+    def _open(self, path):
+        if path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        try:
+            return open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+
+    def _records(self, handle, fmt):
+        """Yield normalized (title, author, [library names]) tuples one line at a time"""
+        if fmt == 'jsonl':
+            rows = self._json_lines(handle)
+        else:
+            rows = csv.DictReader(handle)
+        for line_no, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                raise CommandError(f'Record {line_no}: expected an object, got {type(row).__name__}')
+            title = row.get('title') or ''
+            author = row.get('author') or ''
+            if not isinstance(title, str) or not isinstance(author, str):
+                raise CommandError(f'Record {line_no}: "title" and "author" must be strings')
+            title, author = title.strip(), author.strip()
+            if not title or not author:
+                raise CommandError(f'Record {line_no}: "title" and "author" are required')
+            libraries = row.get('libraries') or []
+            if isinstance(libraries, str):
+                libraries = libraries.split(self.library_separator)
+            elif not isinstance(libraries, list) or not all(isinstance(name, str) for name in libraries):
+                raise CommandError(f'Record {line_no}: "libraries" must be a list of names or a string')
+            yield title, author, [name.strip() for name in libraries if name.strip()]
+
+    def _json_lines(self, handle):
+        for line_no, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:
+                raise CommandError(f'Line {line_no}: invalid JSON ({exc})')
+
+    @write_transaction()
+    def _write_batch(self, batch):
+        new_authors = {author for _, author, _ in batch if author not in self.author_ids}
+        if new_authors:
+            created = Author.objects.bulk_create([Author(name=name) for name in new_authors])
+            self.author_ids.update((author.name, author.pk) for author in created)
+
+        new_libraries = {name for _, _, libs in batch for name in libs if name not in self.library_ids}
+        if new_libraries:
+            created = Library.objects.bulk_create([Library(name=name) for name in new_libraries])
+            self.library_ids.update((library.name, library.pk) for library in created)
+
+        books = Book.objects.bulk_create([
+            Book(title=title, author_id=self.author_ids[author]) for title, author, _ in batch
+        ])
+
+        Holding = Library.books.through
+        holdings = []
+        for book, (_, _, libs) in zip(books, batch):
+            for name in libs:
+                library_id = self.library_ids[name]
+                holdings.append(Holding(library_id=library_id, book_id=book.pk))
+                self.touched_libraries.add(library_id)
+        if holdings:
+            Holding.objects.bulk_create(holdings, ignore_conflicts=True)
+
+        self.touched_authors.update(book.author_id for book in books)
+        self.new_book_ids.extend(book.pk for book in books)
+        return len(books)
+
+    def _report(self, total, started, final=False):
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        message = f'{total} books in {elapsed:.1f}s ({rate:,.0f} rows/sec)'
+        if final:
+            self.stdout.write(self.style.SUCCESS(f'Imported {message}'))
+        else:
+            self.stdout.write(message)
@@ -0,0 +1,73 @@
+import io
+import logging
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from relationship_app import benchmark, index_advisor
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every relationship_app route and admin changelist against a generated '
+        'dataset, run EXPLAIN QUERY PLAN on each distinct SELECT, and report full table '
+        'scans and temporary B-trees with the index that would avoid them. Uses a '
+        'throwaway test database unless --current-db is given.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='medium', choices=list(benchmark.DATASET_SIZES),
+                            help='Dataset preset to generate (default: medium)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--current-db', action='store_true',
+                            help='Analyse the data already in the configured database instead of generating it')
+        parser.add_argument('--all', action='store_true',
+                            help=f'Also report tables under {index_advisor.SMALL_TABLE_ROWS} rows')
+        parser.add_argument('--sql', action='store_true', help='Print the statements behind each finding')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The index advisor reads SQLite query plans only')
+
+        quiet_loggers = [logging.getLogger(name) for name in ('django.request', 'relationship_app.timing')]
+        old_levels = [logger.level for logger in quiet_loggers]
+        for logger in quiet_loggers:
+            logger.setLevel(logging.CRITICAL)
+        setup_test_environment()
+        old_config = None
+        if not options['current_db']:
+            old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            if not options['current_db']:
+                self.stdout.write(f'Generating {options["size"]} dataset...')
+                call_command('generate_dataset', clear=True, interactive=False, seed=options['seed'],
+                             stdout=io.StringIO(), **benchmark.DATASET_SIZES[options['size']])
+            statements = index_advisor.capture_statements()
+            findings = index_advisor.advise(statements)
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            for logger, level in zip(quiet_loggers, old_levels):
+                logger.setLevel(level)
+
+        shown = [finding for finding in findings if options['all'] or not finding.harmless]
+        for finding in shown:
+            self.stdout.write(self.style.WARNING(
+                f'{finding.table} ({finding.rows} rows): {", ".join(sorted(finding.problems))}'
+            ))
+            self.stdout.write(f'  -> {finding.suggestion}')
+            for source in finding.sources[:5]:
+                self.stdout.write(f'     {source}')
+            if len(finding.sources) > 5:
+                self.stdout.write(f'     ... and {len(finding.sources) - 5} more pages')
+            if options['sql']:
+                for statement in finding.statements:
+                    self.stdout.write(f'     {statement.sql}')
+        hidden = len(findings) - len(shown)
+        self.stdout.write(self.style.SUCCESS(
+            f'Explained {len(statements)} statements: {len(shown)} findings'
+            + (f' ({hidden} on small tables hidden; use --all)' if hidden else '')
+        ))
@@ -0,0 +1,76 @@
+from django.core.management.base import CommandError
+
+from relationship_app import branches, bulk
+from relationship_app.models import Librarian
+
+from .bulk_holdings import Command as BulkHoldingsCommand
+
+
+class Command(BulkHoldingsCommand):
+    help = (
+        "Compare libraries' holdings, transfer holdings between two libraries, or merge "
+        'libraries into one (optionally closing them), all computed and applied in the database.'
+    )
+
+    def add_arguments(self, parser):
+        operations = parser.add_subparsers(dest='operation', required=True)
+
+        compare = operations.add_parser('compare', help='Union, intersection and unique holdings')
+        compare.add_argument('libraries', nargs='+', help='Library ids or exact names')
+
+        transfer = operations.add_parser('transfer', help='Move holdings from one library to another')
+        transfer.add_argument('source', help='Library id or exact name')
+        transfer.add_argument('target', help='Library id or exact name')
+        transfer.add_argument('--books', help='File listing the book ids to move, or - for stdin (default: all)')
+        transfer.add_argument('--dry-run', action='store_true',
+                              help='Report what would change without writing anything')
+
+        merge = operations.add_parser('merge', help='Merge the holdings of sources into a target')
+        merge.add_argument('target', help='Library id or exact name')
+        merge.add_argument('sources', nargs='+', help='Library ids or exact names')
+        merge.add_argument('--librarian', type=int,
+                           help='Id of the librarian who runs the target afterwards')
+        merge.add_argument('--delete-sources', action='store_true',
+                           help='Delete the source libraries once their holdings have moved')
+        merge.add_argument('--dry-run', action='store_true',
+                           help='Report what would change without writing anything')
+
+    def handle(self, *args, **options):
+        try:
+            getattr(self, f'_{options["operation"]}')(options)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+    def _compare(self, options):
+        libraries = [self._library(value) for value in options['libraries']]
+        comparison = branches.compare_libraries(libraries)
+        for name, unique in comparison.unique.items():
+            self.stdout.write(f'  only in {name}: {unique}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(libraries)} libraries: {comparison.union} books in any, '
+            f'{comparison.intersection} in all'
+        ))
+
+    def _transfer(self, options):
+        source, target = self._library(options['source']), self._library(options['target'])
+        book_ids = None
+        if options['books']:
+            book_ids = bulk.parse_book_ids(self._read(options['books']))
+            if not book_ids:
+                raise CommandError('No book ids given')
+        result = branches.transfer_holdings(source, target, book_ids, dry_run=options['dry_run'])
+        self.stdout.write(self.style.SUCCESS(result.summary()))
+
+    def _merge(self, options):
+        target = self._library(options['target'])
+        sources = [self._library(value) for value in options['sources']]
+        librarian = None
+        if options['librarian'] is not None:
+            try:
+                librarian = Librarian.objects.get(pk=options['librarian'])
+            except Librarian.DoesNotExist:
+                raise CommandError(f'Librarian {options["librarian"]} not found')
+        result = branches.merge_libraries(target, sources, librarian=librarian,
+                                          delete_sources=options['delete_sources'],
+                                          dry_run=options['dry_run'])
+        self.stdout.write(self.style.SUCCESS(result.summary()))
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from relationship_app import sqlite_profile
+
+# Rows ANALYZE samples per index during PRAGMA optimize; keeps a run to milliseconds
+ANALYSIS_LIMIT = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Refresh SQLite planner statistics with PRAGMA optimize (or a full ANALYZE) and '
+        'checkpoint the write-ahead log. Run it from cron, or with --interval to repeat. '
+        'Run it once with --wal at deploy to switch the database to write-ahead logging.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='Run a full ANALYZE of every table instead of PRAGMA optimize')
+        parser.add_argument('--wal', action='store_true',
+                            help='First switch the database to write-ahead logging (stored in the file)')
+        parser.add_argument('--checkpoint', action='store_true',
+                            help='Also fold the WAL back into the database file and truncate it')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Repeat every N seconds until interrupted (default: run once)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('optimize_database maintains SQLite databases only')
+        if options['wal']:
+            connection.ensure_connection()
+            mode = sqlite_profile.enable_wal(connection.connection)
+            if mode != sqlite_profile.JOURNAL_MODE:
+                raise CommandError(f'Could not switch to WAL; the journal mode is still {mode}')
+            self.stdout.write(f'Journal mode: {mode}')
+        while True:
+            self._run(options)
+            if not options['interval']:
+                return
+            connection.close()
+            time.sleep(options['interval'])
+
+    def _run(self, options):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            has_statistics = cursor.fetchone() is not None
+            if options['analyze'] or not has_statistics:
+                # PRAGMA optimize only refreshes statistics that already exist
+                cursor.execute('ANALYZE')
+                action = 'ANALYZE'
+            else:
+                # Only re-analyses tables whose statistics are missing or stale
+                cursor.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+                cursor.execute('PRAGMA optimize')
+                action = 'PRAGMA optimize'
+            cursor.execute('SELECT COUNT(DISTINCT tbl) FROM sqlite_stat1')
+            analysed = cursor.fetchone()[0]
+            message = f'{action}: statistics for {analysed} tables'
+            if options['checkpoint']:
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log_pages, checkpointed = cursor.fetchone()
+                if log_pages < 0:
+                    message += '; not in WAL mode, nothing to checkpoint'
+                else:
+                    message += f'; checkpointed {checkpointed}/{log_pages} WAL pages' + (' (busy)' if busy else '')
+        self.stdout.write(self.style.SUCCESS(f'{message} ({(time.perf_counter() - started) * 1000:.0f}ms)'))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from relationship_app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for books and authors'
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            self.stdout.write(self.style.WARNING('Full-text index requires SQLite; nothing to do.'))
+            return
+
+        started = time.perf_counter()
+        count = search.rebuild_index()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} books in {elapsed:.2f}s'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from relationship_app.counters import refresh_author_counts, refresh_library_counts
+from relationship_app.page_cache import bump_catalog_version
+from relationship_app.sqlite_profile import write_transaction
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized book/author counters on Library and Author'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with write_transaction():
+            libraries = refresh_library_counts()
+            authors = refresh_author_counts()
+            bump_catalog_version()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Recounted {libraries} libraries and {authors} authors in {elapsed:.2f}s'
+        ))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from relationship_app.stats import refresh_catalog_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount catalog totals into the CatalogStats row (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        totals = refresh_catalog_stats()
+        elapsed = time.perf_counter() - started
+        summary = ', '.join(f'{field}={value}' for field, value in totals.items())
+        self.stdout.write(self.style.SUCCESS(f'Refreshed catalog stats in {elapsed:.2f}s: {summary}'))
@@ -0,0 +1,240 @@
+"""
+A small Prometheus-compatible metrics registry.
+
+Counters and histograms are kept in process memory. When
+settings.METRICS_MULTIPROC_DIR is set, each worker also dumps its values to
+`<dir>/metrics-<pid>.json` (atomically, at most every
+METRICS_FLUSH_INTERVAL seconds and at exit). The /metrics endpoint then
+sums the files of every worker, so any worker can answer a scrape for the
+whole server. One thread at a time writes the file; others skip the flush
+rather than wait, and a failed write is dropped so that metrics never turn
+a request into an error.
+"""
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+_SEPARATOR = '\x1f'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def empty(self):
+        return 0.0
+
+    def merge(self, left, right):
+        return left + right
+
+    def apply(self, current, amount):
+        return current + amount
+
+    def expose(self, samples):
+        lines = []
+        for key, value in sorted(samples.items()):
+            labels = _format_labels(self.labelnames, key.split(_SEPARATOR) if self.labelnames else [])
+            lines.append(f'{self.name}_total{labels} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def empty(self):
+        # per-bucket (non-cumulative) counts, then sum, then count
+        return [0] * len(self.buckets) + [0.0, 0]
+
+    def merge(self, left, right):
+        return [a + b for a, b in zip(left, right)]
+
+    def apply(self, current, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                current[i] += 1
+                break
+        current[-2] += value
+        current[-1] += 1
+        return current
+
+    def expose(self, samples):
+        lines = []
+        for key, values in sorted(samples.items()):
+            label_values = key.split(_SEPARATOR) if self.labelnames else []
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                labels = _format_labels(self.labelnames, label_values, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, label_values, [('le', '+Inf')])
+            lines.append(f'{self.name}_bucket{labels} {values[-1]}')
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_value(values[-2])}')
+            lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        self._values[metric.name] = {}
+        return metric
+
+    def record(self, name, amount, labels=()):
+        metric = self._metrics[name]
+        key = _SEPARATOR.join(str(value) for value in labels)
+        with self._lock:
+            samples = self._values[name]
+            samples[key] = metric.apply(samples.get(key, metric.empty()), amount)
+        self._maybe_flush()
+
+    # === multi-process support ===
+
+    def _directory(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def _snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self._values))
+
+    def _maybe_flush(self):
+        if self._directory() and time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            self.flush()
+
+    def flush(self):
+        """Write this process's values where other workers can read them"""
+        directory = self._directory()
+        if not directory:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return  # another thread is writing this process's file right now
+        try:
+            self._last_flush = time.monotonic()
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+            # A unique temporary name in the same directory, so os.replace stays atomic
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'metrics-{os.getpid()}.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as handle:
+                    json.dump(self._snapshot(), handle)
+                os.replace(tmp_path, path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError:
+            pass  # the next flush tries again
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Values for every metric, summed over all worker processes"""
+        merged = self._snapshot()
+        directory = self._directory()
+        if directory:
+            own = os.path.join(directory, f'metrics-{os.getpid()}.json')
+            for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+                if path == own:
+                    continue  # live values are newer than our last flush
+                try:
+                    with open(path) as handle:
+                        other = json.load(handle)
+                except (OSError, ValueError):
+                    continue
+                for name, samples in other.items():
+                    metric = self._metrics.get(name)
+                    if metric is None:
+                        continue
+                    target = merged.setdefault(name, {})
+                    for key, value in samples.items():
+                        target[key] = metric.merge(target.get(key, metric.empty()), value)
+        return merged
+
+    def expose(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        collected = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.expose(collected.get(name, {})))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+registry.register(Histogram(
+    'http_request_duration_seconds', 'Request latency by URL name',
+    labelnames=('url_name', 'method'),
+))
+registry.register(Histogram(
+    'http_request_sql_queries', 'SQL queries issued per request by URL name',
+    labelnames=('url_name',), buckets=QUERY_BUCKETS,
+))
+registry.register(Counter(
+    'cache_requests', 'Cache lookups by cache and result (hit/miss)',
+    labelnames=('cache', 'result'),
+))
+registry.register(Histogram(
+    'auth_duration_seconds', 'Time spent authenticating users and loading them per request',
+    labelnames=('operation',),
+))
+
+
+def observe_request(url_name, method, seconds, queries):
+    registry.record('http_request_duration_seconds', seconds, (url_name, method))
+    registry.record('http_request_sql_queries', queries, (url_name,))
+
+
+def record_cache(cache_name, hit, count=1):
+    if count:
+        registry.record('cache_requests', count, (cache_name, 'hit' if hit else 'miss'))
+
+
+def observe_auth(operation, seconds):
+    registry.record('auth_duration_seconds', seconds, (operation,))
@@ -0,0 +1,87 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from . import metrics
+from .roles import role_for_user
+from .timing import RequestTimer, current_timer
+
+
+class RoleMiddleware:
+    """Attach the current user's immutable role as request.role (must follow AuthenticationMiddleware)
+
+    Under ASGI the role stays lazy: async views resolve it without blocking
+    through roles.aget_request_role().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.role = SimpleLazyObject(lambda: role_for_user(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.role = SimpleLazyObject(lambda: role_for_user(request.user))
+        return await self.get_response(request)
+
+
+class RequestTimingMiddleware:
+    """Measure SQL, template, view and total time; emit Server-Timing and a log line (place first)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Keep the hook on the event loop instead of a thread hop per request
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer)
+
+    async def __acall__(self, request):
+        timer, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer)
+
+    def start(self, request):
+        request.timer = timer = RequestTimer()
+        return timer, current_timer.set(timer)
+
+    def finish(self, request, response, timer):
+        if timer.view_started is not None:
+            timer.view_ms = (time.perf_counter() - timer.view_started) * 1000
+        total_ms = timer.total_ms
+        response['Server-Timing'] = timer.server_timing(total_ms)
+        timer.log(request, response, total_ms)
+        # Unresolved paths share one label so 404 scans can't explode cardinality
+        url_name = timer.url_name(request, default='<unmatched>')
+        metrics.observe_request(url_name, request.method, total_ms / 1000, timer.db_queries)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timer.view_started = time.perf_counter()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request.timer.view_started = time.perf_counter()
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    schema_editor.execute(
+        "UPDATE relationship_app_author SET book_count = ("
+        "SELECT COUNT(*) FROM relationship_app_book b "
+        "WHERE b.author_id = relationship_app_author.id)"
+    )
+    schema_editor.execute(
+        "UPDATE relationship_app_library SET "
+        "book_count = (SELECT COUNT(*) FROM relationship_app_library_books lb "
+        "WHERE lb.library_id = relationship_app_library.id), "
+        "author_count = (SELECT COUNT(DISTINCT b.author_id) FROM relationship_app_library_books lb "
+        "JOIN relationship_app_book b ON b.id = lb.book_id "
+        "WHERE lb.library_id = relationship_app_library.id)"
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0004_book_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='library',
+            name='author_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='library',
+            name='book_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
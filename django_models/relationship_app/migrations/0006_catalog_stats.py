@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_stats_row(apps, schema_editor):
+    CatalogStats = apps.get_model('relationship_app', 'CatalogStats')
+    CatalogStats.objects.update_or_create(pk=1, defaults={
+        'total_users': apps.get_model(settings.AUTH_USER_MODEL).objects.count(),
+        'total_authors': apps.get_model('relationship_app', 'Author').objects.count(),
+        'total_books': apps.get_model('relationship_app', 'Book').objects.count(),
+        'total_libraries': apps.get_model('relationship_app', 'Library').objects.count(),
+        'refreshed_at': timezone.now(),
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0005_holding_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.IntegerField(default=0)),
+                ('total_authors', models.IntegerField(default=0)),
+                ('total_books', models.IntegerField(default=0)),
+                ('total_libraries', models.IntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Catalog Statistics',
+                'verbose_name_plural': 'Catalog Statistics',
+            },
+        ),
+        migrations.RunPython(create_stats_row, migrations.RunPython.noop),
+    ]
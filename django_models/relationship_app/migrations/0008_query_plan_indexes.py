@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['name', '-id'], name='author_name_id_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['title', '-id'], name='book_title_id_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['role'], name='userprofile_role_idx'),
+        ),
+        # The auto-created Library.books table has no model state to attach an
+        # index to. (library_id, book_id) is covered by its unique constraint;
+        # this covers the reverse direction (which libraries hold these books).
+        migrations.RunSQL(
+            'CREATE INDEX "library_books_book_library_idx" '
+            'ON "relationship_app_library_books" ("book_id", "library_id")',
+            reverse_sql='DROP INDEX "library_books_book_library_idx"',
+        ),
+    ]
@@ -1,4 +1,5 @@
 ﻿from django.db import models
+from django.db.models import Prefetch
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -31,6 +32,10 @@ class UserProfile(models.Model):
     class Meta:
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
+        indexes = [
+            # Admin role filter and per-role counts
+            models.Index(fields=['role'], name='userprofile_role_idx'),
+        ]
 
 # Signal to create UserProfile when a new User is created
 @receiver(post_save, sender=User)
@@ -46,26 +51,69 @@ def save_user_profile(sender, instance, **kwargs):
 
 class Author(models.Model):
     name = models.CharField(max_length=100)
+    # Maintained by relationship_app.counters; see signals.py
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    # Validators for the JSON API; bulk UPDATEs set it explicitly (see signals.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return self.name
     
     def get_absolute_url(self):
         return reverse('relationship_app:list_books')
+    
+    class Meta:
+        indexes = [
+            # Admin sorts by name with the changelist's -pk tiebreaker
+            models.Index(fields=['name', '-id'], name='author_name_id_desc_idx'),
+        ]
+
+class BookQuerySet(models.QuerySet):
+    def with_library_details(self):
+        """Join the author and prefetch the holding libraries with their librarians"""
+        return self.select_related('author').prefetch_related(
+            Prefetch(
+                'libraries',
+                queryset=Library.objects.select_related('librarian').order_by('name', 'id'),
+                to_attr='holding_libraries',
+            )
+        )
 
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name='books')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    objects = BookQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.title} by {self.author.name}"
     
     def get_absolute_url(self):
         return reverse('relationship_app:book_detail', args=[str(self.id)])
+    
+    class Meta:
+        indexes = [
+            # Supports keyset pagination on (title, id)
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'),
+            # Admin sorts by title with the changelist's -pk tiebreaker
+            models.Index(fields=['title', '-id'], name='book_title_id_desc_idx'),
+        ]
+
+class LibraryQuerySet(models.QuerySet):
+    def with_listing_stats(self):
+        """Join the librarian for listing pages; counts come from the denormalized counters"""
+        return self.select_related('librarian')
 
 class Library(models.Model):
     name = models.CharField(max_length=100)
     books = models.ManyToManyField(Book, related_name='libraries')
+    # Maintained by relationship_app.counters; see signals.py
+    book_count = models.PositiveIntegerField(default=0, editable=False)
+    author_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    objects = LibraryQuerySet.as_manager()
     
     def __str__(self):
         return self.name
@@ -74,10 +122,25 @@ class Library(models.Model):
         return reverse('relationship_app:library_detail', args=[str(self.id)])
     
     def get_book_count(self):
-        return self.books.count()
+        return self.book_count
     
     def get_unique_authors(self):
-        return self.books.values_list('author', flat=True).distinct().count()
+        return self.author_count
+
+class CatalogStats(models.Model):
+    """Single-row table of catalog totals read by the dashboards (see relationship_app.stats)"""
+    total_users = models.IntegerField(default=0)
+    total_authors = models.IntegerField(default=0)
+    total_books = models.IntegerField(default=0)
+    total_libraries = models.IntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Catalog statistics (refreshed {self.refreshed_at})"
+    
+    class Meta:
+        verbose_name = 'Catalog Statistics'
+        verbose_name_plural = 'Catalog Statistics'
 
 class Librarian(models.Model):
     name = models.CharField(max_length=100)
@@ -0,0 +1,265 @@
+"""
+Two-tier page cache for the public catalog views.
+
+Catalog pages differ between users only by role (navbar) and by the
+can_*_book buttons, so rendered pages are shared per capability set
+rather than cached per user. The key combines:
+
+- a global catalog version, bumped by the signal handlers whenever books,
+  authors, libraries, librarians or holdings change (so old entries are
+  orphaned at once, like permission snapshots)
+- the capability set: role name, plus the catalog permissions held for
+  views whose template toggles buttons on them
+- the full request path
+
+Lookups go to a small per-process LRU first and then to the shared
+default cache. Each page is rendered with a placeholder for the username,
+which is substituted per request. Requests with pending messages, and
+responses that set cookies, are never cached. Async views get the same
+behaviour with non-blocking cache calls.
+
+Like permission snapshots, cached pages rely on the version bump reaching
+every worker. With a process-local default cache (the locmem default) the
+other workers would keep serving stale pages for PAGE_CACHE_TIMEOUT, so
+pages are not cached there at all. Configure a shared cache
+(DJANGO_REDIS_URL) to enable them.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.html import escape
+
+from . import metrics
+from .permissions import snapshots_enabled
+from .roles import aget_request_role, get_request_role
+
+VERSION_KEY = 'relationship_app:catalog:version'
+USERNAME_PLACEHOLDER = '__relationship_app_username__'
+CATALOG_PERMISSIONS = (
+    'relationship_app.can_add_book',
+    'relationship_app.can_change_book',
+    'relationship_app.can_delete_book',
+)
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version never revives old pages
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def aget_catalog_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog page once the current transaction commits"""
+    def _bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, int(time.time() * 1000), None)
+    transaction.on_commit(_bump)
+
+
+def pages_enabled():
+    """Whether a version bump reaches every worker, which cached pages rely on"""
+    return snapshots_enabled()
+
+
+class LocalPageCache:
+    """Bounded per-process LRU in front of the shared cache"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_pages = LocalPageCache(getattr(settings, 'PAGE_CACHE_LOCAL_ENTRIES', 256))
+
+
+def capability_key(request, permissions=()):
+    """Role name plus which of the given permissions the user holds"""
+    role = get_request_role(request)
+    if not role.is_authenticated or not permissions:
+        return role.name
+    flags = ''.join('1' if request.user.has_perm(perm) else '0' for perm in permissions)
+    return f'{role.name}:{flags}'
+
+
+def page_key(request, permissions=(), version=None):
+    if version is None:
+        version = get_catalog_version()
+    path = hashlib.md5(request.get_full_path().encode('utf-8')).hexdigest()
+    return f'relationship_app:page:{version}:{capability_key(request, permissions)}:{path}'
+
+
+class _PlaceholderUser:
+    """The real user, except that its username renders as a placeholder"""
+
+    username = USERNAME_PLACEHOLDER
+
+    def __init__(self, user):
+        self._user = user
+
+    def __getattr__(self, name):
+        return getattr(self._user, name)
+
+
+def _username(request):
+    return escape(request.user.username) if request.user.is_authenticated else ''
+
+
+def _respond(request, entry, source):
+    content, content_type = entry
+    response = HttpResponse(content.replace(USERNAME_PLACEHOLDER, _username(request)), content_type=content_type)
+    response['X-Page-Cache'] = source
+    return response
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _skip(request):
+    return not pages_enabled() or request.method not in ('GET', 'HEAD') or len(get_messages(request))
+
+
+def _local_hit(request, key):
+    entry = local_pages.get(key)
+    metrics.record_cache('page_local', entry is not None)
+    return None if entry is None else _respond(request, entry, 'hit-local')
+
+
+def _shared_hit(request, key, entry):
+    metrics.record_cache('page_shared', entry is not None)
+    if entry is None:
+        return None
+    local_pages.set(key, entry)
+    return _respond(request, entry, 'hit-shared')
+
+
+def _render_miss(request, response):
+    """Render a response produced for the placeholder user; return its cache entry, or None"""
+    if hasattr(response, 'render'):
+        response.render()
+    if _cacheable(request, response):
+        return (response.content.decode(response.charset), response['Content-Type'])
+    return None
+
+
+def _uncached(request, response):
+    if not response.streaming:
+        response.content = response.content.replace(
+            USERNAME_PLACEHOLDER.encode(), _username(request).encode(response.charset)
+        )
+    return response
+
+
+def _timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+
+
+def cache_catalog_page(permissions=()):
+    """Serve a view from the shared page cache, keyed by catalog version and capability set
+
+    Pass the permissions the template checks (e.g. CATALOG_PERMISSIONS) so
+    users with different grants get different variants.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                # Resolves the user and their session before anything reads them
+                await aget_request_role(request)
+                if permissions and request.user.is_authenticated and not request.user.is_superuser:
+                    # Fills the permission cache that capability_key() and the template read
+                    # (superusers pass has_perm() without it)
+                    await request.user.aget_all_permissions()
+                if _skip(request):
+                    return await view_func(request, *args, **kwargs)
+
+                key = page_key(request, permissions, version=await aget_catalog_version())
+                response = _local_hit(request, key) or _shared_hit(request, key, await cache.aget(key))
+                if response is not None:
+                    return response
+
+                user = request.user
+                request.user = _PlaceholderUser(user)
+                try:
+                    response = await view_func(request, *args, **kwargs)
+                    entry = _render_miss(request, response)
+                finally:
+                    request.user = user
+                if entry is None:
+                    return _uncached(request, response)
+                await cache.aset(key, entry, _timeout())
+                local_pages.set(key, entry)
+                return _respond(request, entry, 'miss')
+            return _async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if _skip(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_key(request, permissions)
+            response = _local_hit(request, key) or _shared_hit(request, key, cache.get(key))
+            if response is not None:
+                return response
+
+            user = request.user
+            request.user = _PlaceholderUser(user)
+            try:
+                response = view_func(request, *args, **kwargs)
+                entry = _render_miss(request, response)
+            finally:
+                request.user = user
+            if entry is None:
+                return _uncached(request, response)
+            cache.set(key, entry, _timeout())
+            local_pages.set(key, entry)
+            return _respond(request, entry, 'miss')
+        return _wrapped_view
+    return decorator
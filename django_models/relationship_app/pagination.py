@@ -0,0 +1,164 @@
+"""
+Keyset (cursor) pagination for catalog listings.
+
+Pages are located by seeking past the last row of the previous page on a
+stable ordering such as (title, id), so no COUNT(*) or OFFSET scan is needed
+and page 10,000 costs the same as page 1.
+
+A cursor is client input: decode_cursor() converts every value with the
+ordering field's to_python() and validators, so a forged cursor raises
+InvalidCursor instead of failing inside the query.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values, direction):
+    """Encode ordering values and a direction into an opaque URL-safe token"""
+    raw = json.dumps([direction, list(values)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """Decode a token produced by encode_cursor(), converting each value for its model field"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+    if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(fields):
+        raise InvalidCursor('Invalid cursor')
+    converted = []
+    for field, value in zip(fields, values):
+        # encode_cursor() only writes scalars; never compare against NULL
+        if value is None or isinstance(value, (bool, list, dict)):
+            raise InvalidCursor('Invalid cursor')
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+        except ValidationError:
+            raise InvalidCursor('Invalid cursor')
+        converted.append(value)
+    return direction, converted
+
+
+def ordering_fields(model, ordering):
+    """The model field behind each name of an ordering, following __ relations"""
+    fields = []
+    for name in ordering:
+        opts = model._meta
+        *relations, last = name.lstrip('-').split('__')
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        fields.append(opts.get_field(last))
+    return fields
+
+
+def seek_filter(fields, values, forward=True):
+    """Build the row-value comparison (f1, f2, ...) > (v1, v2, ...) as a Q object"""
+    lookup = 'gt' if forward else 'lt'
+    condition = Q()
+    for i, field in enumerate(fields):
+        term = Q(**{f'{field}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values[:i]):
+            term &= Q(**{prev_field: prev_value})
+        condition |= term
+    return condition
+
+
+class KeysetPage:
+    """A single page of results together with the cursors around it"""
+
+    def __init__(self, object_list, fields, has_next, has_previous):
+        self.object_list = object_list
+        self.fields = fields
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return encode_cursor(self._key(self.object_list[-1]), 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        return encode_cursor(self._key(self.object_list[0]), 'prev')
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking on a unique, stable ordering"""
+
+    def __init__(self, queryset, ordering=('title', 'id'), per_page=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        """Return the KeysetPage located by cursor (first page when cursor is empty)"""
+        queryset, direction = self._page_queryset(cursor)
+        return self._make_page(list(queryset), direction)
+
+    async def apage(self, cursor=None):
+        """Async page(), fetching the rows through the async ORM"""
+        queryset, direction = self._page_queryset(cursor)
+        return self._make_page([obj async for obj in queryset], direction)
+
+    def _page_queryset(self, cursor):
+        """The sliced queryset for cursor (one row more than a page) and its direction"""
+        if not cursor:
+            return self.queryset.order_by(*self.ordering)[:self.per_page + 1], None
+
+        direction, values = decode_cursor(cursor, ordering_fields(self.queryset.model, self.ordering))
+        if direction == 'next':
+            qs = self.queryset.filter(seek_filter(self.ordering, values, forward=True))
+            return qs.order_by(*self.ordering)[:self.per_page + 1], direction
+
+        # Walk backwards from the cursor; _make_page restores the natural order
+        qs = self.queryset.filter(seek_filter(self.ordering, values, forward=False))
+        reverse = [f'-{field}' for field in self.ordering]
+        return qs.order_by(*reverse)[:self.per_page + 1], direction
+
+    def _make_page(self, rows, direction):
+        if direction != 'prev':
+            return KeysetPage(rows[:self.per_page], self.ordering,
+                              has_next=len(rows) > self.per_page, has_previous=direction == 'next')
+        page_rows = rows[:self.per_page]
+        page_rows.reverse()
+        return KeysetPage(page_rows, self.ordering,
+                          has_next=True, has_previous=len(rows) > self.per_page)
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE):
+    """Read ?per_page= from the request, clamped to MAX_PAGE_SIZE"""
+    try:
+        size = int(request.GET.get('per_page', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
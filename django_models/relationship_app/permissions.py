@@ -0,0 +1,74 @@
+"""
+Compiled permission snapshots shared across requests.
+
+The full permission set of a user is computed once from the group and
+permission join tables, then stored in the default cache under a key that
+includes a global permissions version. Any change to grants (group
+membership, group permissions, direct user permissions, or the Permission
+and Group rows themselves) bumps the version, which orphans every old
+snapshot at once.
+
+The bump only reaches processes that share the cache. With a process-local
+backend (the locmem default), other workers would keep honouring a revoked
+grant until the snapshot expired, so snapshots are turned off there and
+every request computes permissions from the database. Configure a shared
+cache (DJANGO_REDIS_URL) to enable them.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics
+
+VERSION_KEY = 'relationship_app:perms:version'
+SNAPSHOT_TIMEOUT = 60 * 60
+
+# Backends whose entries live inside one process
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def snapshots_enabled():
+    """Whether a version bump reaches every worker, which snapshots rely on"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def get_permissions_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so a lost version never revives old snapshots
+        cache.add(VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_permissions_version():
+    """Invalidate every snapshot once the current transaction commits"""
+    def _bump():
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, int(time.time() * 1000), None)
+    transaction.on_commit(_bump)
+
+
+def snapshot_key(user):
+    return f'relationship_app:perms:{get_permissions_version()}:{user.pk}:{int(user.is_superuser)}'
+
+
+def get_permission_snapshot(user, compute):
+    """Return the cached permission set for user, calling compute() on a miss"""
+    if not snapshots_enabled():
+        return set(compute())
+    key = snapshot_key(user)
+    perms = cache.get(key)
+    metrics.record_cache('permissions', perms is not None)
+    if perms is None:
+        perms = frozenset(compute())
+        cache.set(key, perms, SNAPSHOT_TIMEOUT)
+    return set(perms)
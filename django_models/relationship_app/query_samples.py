@@ -116,7 +116,7 @@ def run_sample_queries():
     # Count books by author
     print("\nNumber of books by each author:")
     for author in Author.objects.all():
-        count = author.books.count()
+        count = author.book_count  # denormalized counter, no COUNT query
         print(f"  - {author.name}: {count} book(s)")
 
 def cleanup_data():
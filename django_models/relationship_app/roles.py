@@ -0,0 +1,101 @@
+"""
+Request-scoped user roles.
+
+RoleMiddleware attaches an immutable UserRole to every request as
+`request.role`. It is resolved from the profile that ProfileBackend already
+joined onto `request.user`, so role checks in views, decorators and
+templates never go back to the database.
+
+Async views cannot touch the lazy `request.user` on the event loop, so they
+call aget_request_role() first: it loads the user and their profile through
+the async auth API and leaves the resolved user and role on the request for
+the rest of the response.
+"""
+
+from dataclasses import dataclass
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.views import redirect_to_login
+
+from .models import UserProfile
+
+ROLE_LABELS = dict(UserProfile.ROLE_CHOICES)
+DEFAULT_ROLE = 'member'
+
+
+@dataclass(frozen=True)
+class UserRole:
+    name: str
+    is_authenticated: bool = True
+
+    @property
+    def is_admin(self):
+        return self.name == 'admin'
+
+    @property
+    def is_librarian(self):
+        return self.name == 'librarian'
+
+    @property
+    def is_member(self):
+        return self.name == 'member'
+
+    @property
+    def display(self):
+        return ROLE_LABELS.get(self.name, 'Anonymous')
+
+    def __str__(self):
+        return self.name
+
+
+ANONYMOUS_ROLE = UserRole(name='anonymous', is_authenticated=False)
+
+
+def role_for_user(user):
+    """Resolve a user's role without writing anything; users with no profile count as members"""
+    if not user.is_authenticated:
+        return ANONYMOUS_ROLE
+    try:
+        return UserRole(name=user.profile.role)
+    except UserProfile.DoesNotExist:
+        return UserRole(name=DEFAULT_ROLE)
+
+
+def get_request_role(request):
+    """Role attached by RoleMiddleware, or resolved on the spot if the middleware is absent"""
+    role = getattr(request, 'role', None)
+    if role is None:
+        role = role_for_user(request.user)
+    return role
+
+
+async def aget_request_role(request):
+    """Async get_request_role(): resolve the user and role without blocking, once per request"""
+    role = getattr(request, '_async_role', None)
+    if role is None:
+        auser = getattr(request, 'auser', None)
+        user = await auser() if auser is not None else request.user
+        request.user = user
+        request.role = request._async_role = role = role_for_user(user)
+    return role
+
+
+def role_required(*roles):
+    """View decorator allowing only the given role names; others are sent to the login page"""
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                if (await aget_request_role(request)).name in roles:
+                    return await view_func(request, *args, **kwargs)
+                return redirect_to_login(request.get_full_path())
+            return _async_view
+
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if get_request_role(request).name in roles:
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path())
+        return _wrapped_view
+    return decorator
@@ -0,0 +1,146 @@
+"""
+Full-text search over book titles and author names.
+
+On SQLite the catalog is mirrored into an FTS5 virtual table (rowid = book id)
+using the unicode61 tokenizer with diacritics removal, so matching is case and
+accent insensitive and ranked with bm25(). Other backends fall back to a plain
+icontains lookup.
+"""
+
+import re
+
+from django.db import connection, transaction
+
+from .models import Book
+
+FTS_TABLE = 'relationship_app_book_fts'
+
+# Title matches weigh more than author matches when ranking
+TITLE_WEIGHT = 10.0
+AUTHOR_WEIGHT = 2.0
+
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, author_name, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_enabled(using=None):
+    """FTS5 indexing is only available on SQLite"""
+    return (using or connection).vendor == 'sqlite'
+
+
+def build_match_expression(query):
+    """Turn free text into an FTS5 expression: every word must match as a prefix"""
+    tokens = _TOKEN_RE.findall(query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_book(book):
+    """Insert or refresh a single book's row in the index"""
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [book.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, author_name) VALUES (%s, %s, %s)",
+            [book.pk, book.title, book.author.name],
+        )
+
+
+def index_books(book_ids, chunk_size=500):
+    """Add many books to the index with set-based INSERT ... SELECT statements"""
+    if not is_enabled():
+        return
+    book_ids = list(book_ids)
+    book_table = Book._meta.db_table
+    author_table = Book._meta.get_field('author').related_model._meta.db_table
+    with connection.cursor() as cursor:
+        for start in range(0, len(book_ids), chunk_size):
+            chunk = book_ids[start:start + chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, author_name) "
+                f"SELECT b.id, b.title, a.name FROM {book_table} b "
+                f"JOIN {author_table} a ON a.id = b.author_id WHERE b.id IN ({placeholders})",
+                chunk,
+            )
+
+
+def remove_book(book_id):
+    """Drop a book from the index"""
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [book_id])
+
+
+def remove_books(book_ids, chunk_size=500):
+    """Drop many books from the index"""
+    if not is_enabled():
+        return
+    book_ids = list(book_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(book_ids), chunk_size):
+            chunk = book_ids[start:start + chunk_size]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+
+
+def reindex_author(author):
+    """Refresh the author name on every indexed book by this author"""
+    if not is_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET author_name = %s WHERE rowid IN "
+            f"(SELECT id FROM {Book._meta.db_table} WHERE author_id = %s)",
+            [author.name, author.pk],
+        )
+
+
+def rebuild_index():
+    """Repopulate the whole index with one set-based statement; returns the row count"""
+    if not is_enabled():
+        return 0
+    book_table = Book._meta.db_table
+    author_table = Book._meta.get_field('author').related_model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, author_name) "
+            f"SELECT b.id, b.title, a.name FROM {book_table} b "
+            f"JOIN {author_table} a ON a.id = b.author_id"
+        )
+        count = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def search_books(query, limit=50):
+    """Return up to `limit` books matching `query`, best match first"""
+    match = build_match_expression(query)
+    if not match:
+        return []
+
+    if not is_enabled():
+        return list(
+            Book.objects.select_related('author')
+            .filter(title__icontains=query)
+            .order_by('title', 'id')[:limit]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, {AUTHOR_WEIGHT}) LIMIT %s",
+            [match, limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    books = Book.objects.select_related('author').in_bulk(ids)
+    return [books[book_id] for book_id in ids if book_id in books]
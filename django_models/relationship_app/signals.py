@@ -0,0 +1,212 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_save, post_delete, pre_save, pre_delete, m2m_changed, post_migrate,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import search, stats
+from .counters import libraries_holding, refresh_author_counts, refresh_library_counts
+from .models import Author, Book, Library, Librarian
+from .page_cache import bump_catalog_version
+from .permissions import bump_permissions_version
+from .sqlite_profile import apply_profile
+from .timing import install_execute_wrapper
+
+# === SEARCH INDEX SYNC ===
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, raw=False, **kwargs):
+    """Keep the full-text index in step with book edits"""
+    if not raw:
+        search.index_book(instance)
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    search.remove_book(instance.pk)
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created=False, raw=False, **kwargs):
+    """An author rename changes the indexed author name of all their books"""
+    if not raw and not created:
+        search.reindex_author(instance)
+
+# === HOLDING COUNTERS ===
+
+@receiver(m2m_changed, sender=Library.books.through)
+def holdings_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount the libraries whose holdings were added to, removed from or cleared"""
+    if action == 'pre_clear' and reverse:
+        # book.libraries.clear(): remember which libraries lose the book
+        instance._cleared_library_ids = libraries_holding([instance.pk])
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        library_ids = [instance.pk]
+    elif action == 'post_clear':
+        library_ids = getattr(instance, '_cleared_library_ids', set())
+    else:
+        library_ids = pk_set or set()
+    refresh_library_counts(library_ids)
+
+@receiver(pre_save, sender=Book)
+def remember_previous_author(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        instance._previous_author_id = None
+        return
+    instance._previous_author_id = (
+        Book.objects.filter(pk=instance.pk).values_list('author_id', flat=True).first()
+    )
+
+@receiver(post_save, sender=Book)
+def book_saved_counts(sender, instance, created, raw=False, **kwargs):
+    """A new book or an author reassignment changes author and library counters"""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_author_id', None)
+    if created:
+        refresh_author_counts([instance.author_id])
+    elif previous is not None and previous != instance.author_id:
+        refresh_author_counts([previous, instance.author_id])
+        refresh_library_counts(libraries_holding([instance.pk]))
+
+@receiver(pre_delete, sender=Book)
+def remember_holding_libraries(sender, instance, **kwargs):
+    instance._holding_library_ids = libraries_holding([instance.pk])
+
+@receiver(post_delete, sender=Book)
+def book_deleted_counts(sender, instance, **kwargs):
+    refresh_author_counts([instance.author_id])
+    refresh_library_counts(getattr(instance, '_holding_library_ids', set()))
+
+# === API FRESHNESS (updated_at) ===
+# auto_now only covers save(); these bump the rows whose JSON representation
+# changed through a related object. Holding changes are covered by the
+# counter refreshes above, which stamp updated_at on the libraries.
+
+@receiver(post_save, sender=Author)
+def touch_author_books(sender, instance, created=False, raw=False, **kwargs):
+    """Books and holding listings embed the author name"""
+    if raw or created:
+        return
+    now = timezone.now()
+    Book.objects.filter(author=instance).update(updated_at=now)
+    Library.objects.filter(books__author=instance).update(updated_at=now)
+
+@receiver(post_save, sender=Book)
+def touch_book_libraries(sender, instance, created=False, raw=False, **kwargs):
+    """Holding listings embed the book title"""
+    if not raw and not created:
+        Library.objects.filter(books=instance).update(updated_at=timezone.now())
+
+@receiver(m2m_changed, sender=Library.books.through)
+def touch_held_books(sender, instance, action, reverse, pk_set, **kwargs):
+    """Book details list the libraries holding the book"""
+    if action == 'pre_clear' and not reverse:
+        # library.books.clear(): remember which books lose the library
+        instance._cleared_book_ids = list(instance.books.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        book_ids = [instance.pk]
+    elif action == 'post_clear':
+        book_ids = getattr(instance, '_cleared_book_ids', [])
+    else:
+        book_ids = list(pk_set or [])
+    now = timezone.now()
+    for start in range(0, len(book_ids), 500):
+        Book.objects.filter(pk__in=book_ids[start:start + 500]).update(updated_at=now)
+
+@receiver(post_save, sender=Library)
+def touch_renamed_library_books(sender, instance, created=False, raw=False, **kwargs):
+    """Book details embed the names of the libraries holding them"""
+    if not raw and not created:
+        Book.objects.filter(libraries=instance).update(updated_at=timezone.now())
+
+@receiver(pre_delete, sender=Library)
+def touch_deleted_library_books(sender, instance, **kwargs):
+    """The cascade to the holdings sends no m2m_changed; stamp the books while they can be found"""
+    Book.objects.filter(libraries=instance).update(updated_at=timezone.now())
+
+@receiver(post_save, sender=Librarian)
+@receiver(post_delete, sender=Librarian)
+def touch_librarian_library(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Library.objects.filter(pk=instance.library_id).update(updated_at=timezone.now())
+
+# === PAGE CACHE INVALIDATION ===
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+@receiver(post_save, sender=Library)
+@receiver(post_delete, sender=Library)
+@receiver(post_save, sender=Librarian)
+@receiver(post_delete, sender=Librarian)
+def catalog_rows_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_catalog_version()
+
+@receiver(m2m_changed, sender=Library.books.through)
+def catalog_holdings_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_catalog_version()
+
+# === CATALOG STATISTICS ===
+
+def _stats_field(sender):
+    for field, model in stats.COUNTED_MODELS.items():
+        if model is sender:
+            return field
+    return None
+
+@receiver(post_save)
+def counted_row_created(sender, instance, created, raw=False, **kwargs):
+    field = _stats_field(sender)
+    if field and created and not raw:
+        stats.adjust(field, 1)
+
+@receiver(post_delete)
+def counted_row_deleted(sender, instance, **kwargs):
+    field = _stats_field(sender)
+    if field:
+        stats.adjust(field, -1)
+
+# === PERMISSION SNAPSHOT INVALIDATION ===
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def grants_changed(sender, action, **kwargs):
+    """Group membership or granted permissions changed"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_permissions_version()
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def permission_rows_changed(sender, **kwargs):
+    bump_permissions_version()
+
+@receiver(post_migrate)
+def permissions_migrated(sender, **kwargs):
+    bump_permissions_version()
+
+# === REQUEST TIMING ===
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    """Report the new connection's queries to whichever request timer is current"""
+    install_execute_wrapper(connection)
+
+# === SQLITE PROFILE ===
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """WAL journaling, cache, mmap and busy timeout for every new SQLite connection"""
+    apply_profile(connection)
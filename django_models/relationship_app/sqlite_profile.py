@@ -0,0 +1,228 @@
+"""
+Production connection profile for SQLite.
+
+A fresh SQLite database uses a rollback journal: a writer locks readers out
+while it commits, and anything that waits longer than the busy timeout
+fails with "database is locked". Write-ahead logging lets readers keep
+reading the last committed snapshot while one writer appends. The journal
+mode is stored in the database file, so it is switched once, by
+enable_wal() ("manage.py optimize_database --wal" at deploy), rather than
+by every connection: a stray "manage.py check" must not rewrite a database
+it only looks at.
+
+apply_profile() runs on every new connection (see signals.py) and tunes the
+per-connection pragmas that matter for a mostly-read catalog: page cache
+size, memory-mapped reads, temporary tables in memory, and how long a
+writer waits for the lock before giving up. synchronous=NORMAL is only
+applied to databases already in WAL mode, where it is safe.
+
+write_transaction() is transaction.atomic() for the write paths (bulk
+edits, imports, merges, recounts): under WAL a DEFERRED transaction that
+reads before it writes cannot wait for the lock once another writer has
+committed, and fails with "database is locked" instead. It begins with
+BEGIN IMMEDIATE, taking the write lock up front and waiting out the busy
+timeout. Other transactions keep the default DEFERRED mode, so read-only
+atomic blocks never queue behind writers.
+
+settings.SQLITE_PRAGMAS overrides individual values (including
+journal_mode, to opt in to switching it on connect); None leaves SQLite's
+own default in place. The pragmas run on the raw DB-API connection, so they
+never count against a view's query budget.
+
+measure_throughput() is the workload behind the benchmark_sqlite command:
+reader threads page through the catalog while writer threads stamp books,
+against a copy of the database, so profiles can be compared side by side.
+"""
+
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from .models import Book
+
+# Readers see the last commit while a writer appends to the log. Persistent:
+# set by enable_wal(), not on connect
+JOURNAL_MODE = 'wal'
+
+DEFAULT_PRAGMAS = {
+    # In WAL mode NORMAL only syncs at checkpoints; a power loss can drop the
+    # last commits but never corrupts the database (applied in WAL mode only)
+    'synchronous': 'normal',
+    # Milliseconds a writer waits for the lock before "database is locked"
+    'busy_timeout': 5000,
+    # Negative values are KiB: a 64 MiB page cache per connection
+    'cache_size': -64000,
+    # Read through a 256 MiB memory map instead of read() calls
+    'mmap_size': 256 * 1024 * 1024,
+    # Sorts and temp B-trees stay in memory
+    'temp_store': 'memory',
+}
+
+# What a database gets without the profile, for comparison
+ROLLBACK_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 5000,
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'default',
+}
+
+
+def get_pragmas():
+    """The pragmas to apply, with settings.SQLITE_PRAGMAS layered over the defaults"""
+    pragmas = dict(DEFAULT_PRAGMAS, **getattr(settings, 'SQLITE_PRAGMAS', {}))
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+
+def set_pragmas(raw_connection, pragmas):
+    """Run PRAGMA name = value for each entry on a sqlite3 connection"""
+    for name, value in pragmas.items():
+        raw_connection.execute(f'PRAGMA {name} = {value}')
+
+
+def apply_profile(connection):
+    """Apply the production pragmas to a newly opened Django SQLite connection"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas()
+    raw = connection.connection
+    journal_mode = pragmas.pop('journal_mode', None)
+    if connection.is_in_memory_db():
+        # Nothing to journal or map for a test database held in memory
+        journal_mode = None
+        pragmas.pop('mmap_size', None)
+    if journal_mode is not None:
+        set_pragmas(raw, {'journal_mode': journal_mode})
+    overrides = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if 'synchronous' not in overrides and raw.execute('PRAGMA journal_mode').fetchone()[0] != 'wal':
+        # NORMAL can corrupt a rollback-journal database on power loss; keep FULL
+        pragmas.pop('synchronous', None)
+    set_pragmas(raw, pragmas)
+
+
+def enable_wal(raw_connection):
+    """Switch the database to write-ahead logging; returns the journal mode now in effect"""
+    return raw_connection.execute(f'PRAGMA journal_mode = {JOURNAL_MODE}').fetchone()[0]
+
+
+def current_pragmas(raw_connection, names=('journal_mode', *DEFAULT_PRAGMAS)):
+    """Current values of pragmas on a sqlite3 connection (None where SQLite reports nothing)"""
+    rows = {name: raw_connection.execute(f'PRAGMA {name}').fetchone() for name in names}
+    return {name: row[0] if row else None for name, row in rows.items()}
+
+
+@contextmanager
+def write_transaction(using=DEFAULT_DB_ALIAS, immediate=True):
+    """transaction.atomic() that takes SQLite's write lock at BEGIN (when immediate and outermost)"""
+    connection = connections[using]
+    if not immediate or connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # Connecting resets transaction_mode from OPTIONS, so connect first
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+
+# === THROUGHPUT BENCHMARK ===
+
+def _workload_sql():
+    """The catalog's keyset page query, as the ORM writes it, and a single-book stamp"""
+    page = Book.objects.select_related('author').filter(title__gte='').order_by('title', 'id')[:50]
+    page_sql, _ = page.query.sql_with_params()
+    stamp_sql = f'UPDATE "{Book._meta.db_table}" SET "updated_at" = ? WHERE "{Book._meta.pk.column}" = ?'
+    return page_sql.replace('%s', '?'), stamp_sql
+
+
+def _worker(path, pragmas, deadline, action, results):
+    raw = sqlite3.connect(path, isolation_level=None)
+    set_pragmas(raw, pragmas)
+    latencies = []
+    errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                action(raw)
+            except sqlite3.OperationalError:
+                # "database is locked": the busy timeout ran out
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        raw.close()
+    results.append((latencies, errors))
+
+
+def measure_throughput(path, pragmas, seconds=10, readers=4, writers=1, seed=42):
+    """Run readers and writers against a copy of the SQLite file at path; return ops/s and latencies"""
+    page_sql, stamp_sql = _workload_sql()
+    rng = random.Random(seed)
+    with closing(sqlite3.connect(path)) as source:
+        titles = [row[0] for row in source.execute(
+            f'SELECT title FROM {Book._meta.db_table} ORDER BY random() LIMIT 1000')]
+        book_ids = [row[0] for row in source.execute(
+            f'SELECT id FROM {Book._meta.db_table} ORDER BY random() LIMIT 10000')]
+    if not titles:
+        raise ValueError('The database has no books to read')
+
+    def read(raw):
+        raw.execute(page_sql, [rng.choice(titles)]).fetchall()
+
+    def write(raw):
+        raw.execute('BEGIN IMMEDIATE')
+        try:
+            raw.execute(stamp_sql, [timezone.now().isoformat(' '), rng.choice(book_ids)])
+            raw.execute('COMMIT')
+        except sqlite3.OperationalError:
+            if raw.in_transaction:
+                raw.execute('ROLLBACK')
+            raise
+
+    with tempfile.TemporaryDirectory() as scratch:
+        copy = str(Path(scratch) / 'throughput.sqlite3')
+        with closing(sqlite3.connect(path)) as source, closing(sqlite3.connect(copy)) as target:
+            source.backup(target)
+        with closing(sqlite3.connect(copy)) as setup:
+            set_pragmas(setup, pragmas)
+            applied = current_pragmas(setup, pragmas)
+
+        results = {'read': [], 'write': []}
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=_worker, args=(copy, pragmas, deadline, action, results[kind]))
+            for kind, action, count in (('read', read, readers), ('write', write, writers))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    report = {'pragmas': applied}
+    for kind, outcomes in results.items():
+        latencies = [latency for thread_latencies, _ in outcomes for latency in thread_latencies]
+        report[kind] = {
+            'ops_per_s': round(len(latencies) / seconds, 1),
+            'errors': sum(errors for _, errors in outcomes),
+            'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+            'p99_ms': round(statistics.quantiles(latencies, n=100)[98], 2) if len(latencies) > 1 else None,
+        }
+    return report
@@ -0,0 +1,79 @@
+"""
+Catalog statistics for the dashboards.
+
+Totals live in the single CatalogStats row. Signal handlers adjust them
+with F() increments as users, authors, books and libraries come and go, so
+reads are a primary-key lookup. Bulk writes that skip signals are
+reconciled by a full recount, either from `manage.py refresh_catalog_stats`
+or in a background thread once the row is older than
+CATALOG_STATS_MAX_AGE (stale-while-revalidate: the request that notices
+staleness still gets the old numbers immediately).
+"""
+
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Author, Book, CatalogStats, Library
+from .sqlite_profile import write_transaction
+
+STATS_PK = 1
+REFRESH_LOCK_KEY = 'relationship_app:stats:refreshing'
+
+COUNTED_MODELS = {
+    'total_users': User,
+    'total_authors': Author,
+    'total_books': Book,
+    'total_libraries': Library,
+}
+
+
+def _max_age():
+    return getattr(settings, 'CATALOG_STATS_MAX_AGE', 300)
+
+
+def refresh_catalog_stats():
+    """Recount every total and store it; this is the only place that runs COUNT(*)"""
+    totals = {field: model.objects.count() for field, model in COUNTED_MODELS.items()}
+    with write_transaction():
+        CatalogStats.objects.update_or_create(
+            pk=STATS_PK, defaults=dict(totals, refreshed_at=timezone.now())
+        )
+    return totals
+
+
+def _refresh_in_background():
+    try:
+        refresh_catalog_stats()
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        close_old_connections()
+
+
+def schedule_refresh():
+    """Start one background recount unless another worker already is"""
+    if not cache.add(REFRESH_LOCK_KEY, True, _max_age()):
+        return False
+    threading.Thread(target=_refresh_in_background, daemon=True).start()
+    return True
+
+
+def get_catalog_stats():
+    """Return the CatalogStats row, revalidating it in the background when stale"""
+    stats = CatalogStats.objects.filter(pk=STATS_PK).first()
+    if stats is None:
+        stats = CatalogStats(pk=STATS_PK)
+        schedule_refresh()
+    elif stats.refreshed_at is None or (timezone.now() - stats.refreshed_at).total_seconds() > _max_age():
+        schedule_refresh()
+    return stats
+
+
+def adjust(field, delta):
+    """Apply an incremental change to one total"""
+    CatalogStats.objects.filter(pk=STATS_PK).update(**{field: F(field) + delta})
@@ -0,0 +1,33 @@
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+
+class TimedTemplate:
+    """Wrap a backend template so its render time is added to request.timer"""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        timer = getattr(request, 'timer', None)
+        if timer is None:
+            return self._template.render(context, request)
+        started = timer.template_started()
+        try:
+            return self._template.render(context, request)
+        finally:
+            timer.template_finished(started)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The standard Django template backend, with render timing for RequestTimingMiddleware"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
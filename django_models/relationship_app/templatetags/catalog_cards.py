@@ -0,0 +1,16 @@
+from django import template
+
+from ..fragments import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cached_cards(context, objects, template_name, *vary_on):
+    """{% cached_cards books "relationship_app/cards/book_card.html" flag ... as cards %}
+
+    Renders template_name once per object (exposed to it under the model
+    name) and caches each card until the object's updated_at changes.
+    Extra arguments become part of the key, like {% cache %}'s vary_on.
+    """
+    return render_cards(context, objects, template_name, vary_on)
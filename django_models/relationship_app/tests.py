@@ -1,3 +1,524 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.db.models.signals import m2m_changed
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+
+from . import benchmark, branches, bulk, index_advisor, metrics, search, sqlite_profile
+from . import urls as app_urls
+from .budgets import get_query_budget
+from .counters import refresh_author_counts, refresh_library_counts
+from .page_cache import local_pages
+from .pagination import InvalidCursor, KeysetPaginator, encode_cursor
+from .models import Author, Book, CatalogStats, Librarian, Library
+
+
+def generate_dataset(**options):
+    """Replace the test database's catalog with a generated one (one librarian and member)"""
+    options = {'holdings_density': 0.5, 'librarians': 1, 'members': 1, **options}
+    call_command('generate_dataset', clear=True, interactive=False, stdout=StringIO(), **options)
+
+
+class CatalogTestCase(TestCase):
+    """Request timing lines stay out of the test output; DATASET, if set, is generated once per class"""
+
+    # generate_dataset options shared (and rolled back after each test) by the whole class
+    DATASET = None
+
+    @classmethod
+    def setUpClass(cls):
+        timing_logger = logging.getLogger('relationship_app.timing')
+        timing_logger.disabled = True
+        cls.addClassCleanup(setattr, timing_logger, 'disabled', False)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        if cls.DATASET is not None:
+            generate_dataset(**cls.DATASET)
+
+
+class QueryBudgetTests(CatalogTestCase):
+    """Every routed view stays within its declared query budget at any data size"""
+
+    # (books, authors, libraries) for the two scales compared
+    SCALES = [(30, 10, 3), (300, 100, 30)]
+
+    def generate(self, books, authors, libraries):
+        generate_dataset(books=books, authors=authors, libraries=libraries)
+
+    def measure_all(self):
+        """Query count for every (route, role) on a cold cache"""
+        book_id, library_id = benchmark.sample_ids()
+        # Search for a word that is certain to match at every scale
+        search_term = Book.objects.get(pk=book_id).title.split()[0]
+        counts = {}
+        for role in benchmark.ROLES:
+            client = benchmark.client_for_role(role)
+            for name, kwarg_names in benchmark.iter_routes():
+                url = benchmark.sample_url(name, kwarg_names, book_id, library_id)
+                if name in benchmark.ROUTE_QUERY_STRINGS:
+                    url = url.split('?')[0] + f'?q={search_term}'
+                cache.clear()
+                local_pages.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    client.get(url)
+                counts[name, role] = (url, len(ctx.captured_queries))
+        return counts
+
+    def test_views_declare_budgets(self):
+        for name, _ in benchmark.iter_routes():
+            with self.subTest(route=name):
+                self.assertIsNotNone(get_query_budget(benchmark.route_view(name)),
+                                     f'{name} has no declared query budget')
+
+    def test_query_counts_are_bounded_and_flat(self):
+        results = []
+        for books, authors, libraries in self.SCALES:
+            self.generate(books, authors, libraries)
+            results.append(self.measure_all())
+        small, large = results
+        for key, (url, large_count) in large.items():
+            name, role = key
+            budget = get_query_budget(benchmark.route_view(name))
+            with self.subTest(route=name, role=role):
+                self.assertLessEqual(large_count, budget,
+                                     f'{url} as {role} ran {large_count} queries (budget {budget})')
+                self.assertEqual(small[key][1], large_count,
+                                 f'{url} as {role}: query count grows with row count')
+
+
+class KeysetPaginationTests(CatalogTestCase):
+    """Forged cursors are rejected as invalid pages, never sent to the database"""
+
+    TAMPERED = [['a', 'x'], ['a', None], ['a', ['b']], ['a', {'id': 1}], ['a', True], ['a', 10 ** 30], ['a']]
+
+    DATASET = dict(books=30, authors=5, libraries=2)
+
+    def test_tampered_cursors_are_invalid_pages(self):
+        paginator = KeysetPaginator(Book.objects.all())
+        for values in self.TAMPERED:
+            with self.subTest(values=values), self.assertRaises(InvalidCursor):
+                paginator.page(encode_cursor(values, 'next'))
+        library = Library.objects.order_by('id').first()
+        for url in (reverse('relationship_app:list_books'),
+                    reverse('relationship_app:library_detail', args=[library.pk])):
+            for values in self.TAMPERED:
+                with self.subTest(url=url, values=values):
+                    response = self.client.get(url, {'cursor': encode_cursor(values, 'next')})
+                    self.assertEqual(response.status_code, 404)
+
+    def test_cursor_values_are_converted_for_their_fields(self):
+        first = list(KeysetPaginator(Book.objects.all(), per_page=10).page())
+        cursor = encode_cursor([first[-1].title, str(first[-1].pk)], 'next')
+        self.assertEqual([book.pk for book in KeysetPaginator(Book.objects.all(), per_page=10).page(cursor)],
+                         [book.pk for book in Book.objects.order_by('title', 'id')[10:20]])
+
+
+class PageCacheTests(CatalogTestCase):
+    """Catalog pages are cached only when every worker sees the version bumps"""
+
+    DATASET = dict(books=30, authors=5, libraries=2)
+
+    def setUp(self):
+        local_pages.clear()
+        self.addCleanup(local_pages.clear)
+
+    def cache_status(self, url):
+        return [self.client.get(url).get('X-Page-Cache') for _ in range(2)]
+
+    def test_process_local_cache_serves_pages_uncached(self):
+        url = reverse('relationship_app:list_books')
+        self.assertEqual(self.cache_status(url), [None, None])
+        with tempfile.TemporaryDirectory() as scratch:
+            shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                  'LOCATION': scratch}}
+            with override_settings(CACHES=shared):
+                self.assertEqual(self.cache_status(url), ['miss', 'hit-local'])
+
+
+class AsyncCatalogViewTests(CatalogTestCase):
+    """The async catalog views render what the sync views do, within the same budgets"""
+
+    ROUTES = ('list_books', 'book_detail', 'library_detail', 'library_list', 'home',
+              'admin_dashboard', 'librarian_dashboard', 'member_dashboard')
+
+    DATASET = dict(books=60, authors=10, libraries=3)
+
+    def route_to(self, async_views):
+        """Rebuild the URLconfs with ASYNC_CATALOG_VIEWS set as given"""
+        with override_settings(ASYNC_CATALOG_VIEWS=async_views):
+            importlib.reload(app_urls)
+            importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    def render_all(self, client_for_role, get):
+        book_id, library_id = benchmark.sample_ids()
+        pages = {}
+        for role in benchmark.ROLES:
+            client = client_for_role(role)
+            for name, kwarg_names in benchmark.iter_routes():
+                if name not in self.ROUTES:
+                    continue
+                url = benchmark.sample_url(name, kwarg_names, book_id, library_id)
+                cache.clear()
+                local_pages.clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    response = get(client, url)
+                pages[name, role] = (response.status_code, response.content, len(ctx.captured_queries))
+        return pages
+
+    def async_client_for_role(self, role):
+        client = AsyncClient()
+        if role != 'anonymous':
+            client.force_login(User.objects.get(username=f'bench_{role}_0'))
+        return client
+
+    def test_async_views_match_sync_views(self):
+        expected = self.render_all(benchmark.client_for_role, lambda client, url: client.get(url))
+        self.addCleanup(self.route_to, False)
+        self.route_to(True)
+        actual = self.render_all(self.async_client_for_role, lambda client, url: async_to_sync(client.get)(url))
+        for (name, role), (status, content, queries) in actual.items():
+            with self.subTest(route=name, role=role):
+                self.assertTrue(iscoroutinefunction(benchmark.route_view(name)))
+                self.assertEqual((status, content), expected[name, role][:2])
+                self.assertLessEqual(queries, get_query_budget(benchmark.route_view(name)))
+
+
+class AsgiStartupTests(CatalogTestCase):
+    """The ASGI module warms up even when a server imports it inside its event loop"""
+
+    def test_asgi_application_loads_inside_a_running_loop(self):
+        async def load():
+            sys.modules.pop('django_models.asgi', None)
+            return importlib.import_module('django_models.asgi')
+        # Django is already set up; a second setup() would reconfigure logging under assertLogs
+        with mock.patch.dict(os.environ), mock.patch('django.setup'), \
+                self.assertLogs('relationship_app.warmup', 'INFO') as logs:
+            module = asyncio.run(load())
+        self.assertTrue(callable(module.application))
+        self.assertEqual([line for line in logs.output if 'failed' in line], [])
+        self.assertIn('Warm-up finished', logs.output[-1])
+
+
+class GenerateDatasetTests(CatalogTestCase):
+    """The dataset generator never leaves a known password or wipes a catalog unasked"""
+
+    def generate(self, **options):
+        call_command('generate_dataset', books=20, authors=5, libraries=2, holdings_density=0.5,
+                     admins=1, librarians=1, members=1, stdout=StringIO(), **options)
+
+    def test_generated_users_get_an_unusable_password_by_default(self):
+        self.generate()
+        self.assertFalse(User.objects.get(username='bench_admin_0').has_usable_password())
+        self.generate(clear=True, interactive=False, password='s3cret-for-this-run')
+        self.assertTrue(User.objects.get(username='bench_admin_0').check_password('s3cret-for-this-run'))
+
+    def test_clear_asks_for_confirmation_when_debug_is_off(self):
+        self.generate()
+        with mock.patch('builtins.input', return_value='no') as prompt:
+            with self.assertRaisesMessage(CommandError, 'Clear cancelled'):
+                self.generate(clear=True)
+        prompt.assert_called_once()
+        self.assertEqual(Book.objects.count(), 20)
+        with override_settings(DEBUG=True), mock.patch('builtins.input') as prompt:
+            self.generate(clear=True)
+        prompt.assert_not_called()
+        self.assertEqual(Book.objects.count(), 20)
+
+
+class BulkBookOperationTests(CatalogTestCase):
+    """Set-based bulk operations leave counters, search and statistics as per-row edits would"""
+
+    DATASET = dict(books=1200, authors=20, libraries=4)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.book_ids = list(Book.objects.order_by('id').values_list('id', flat=True))
+
+    def counters(self):
+        return (sorted(Library.objects.values_list('id', 'book_count', 'author_count')),
+                sorted(Author.objects.values_list('id', 'book_count')))
+
+    def assertDerivedDataExact(self):
+        stored = self.counters()
+        refresh_library_counts()
+        refresh_author_counts()
+        self.assertEqual(stored, self.counters())
+        self.assertEqual(CatalogStats.objects.get().total_books, Book.objects.count())
+        for book in Book.objects.select_related('author').order_by('?')[:20]:
+            self.assertIn(book, search.search_books(f'{book.title} {book.author.name}', limit=1000))
+
+    def test_dry_run_writes_nothing(self):
+        before = self.counters()
+        result = bulk.delete_books(self.book_ids[:700] + [0], dry_run=True)
+        self.assertEqual((result.requested, result.matched, result.affected), (701, 700, 700))
+        self.assertEqual(len(result.batches), 2)
+        self.assertEqual(Book.objects.count(), len(self.book_ids))
+        self.assertEqual(before, self.counters())
+
+    def test_reassign_edit_and_delete_keep_derived_data_exact(self):
+        author = Author.objects.order_by('id').first()
+        moving = Book.objects.filter(pk__in=self.book_ids[::2]).exclude(author=author).count()
+        result = bulk.reassign_author(self.book_ids[::2], author)
+        self.assertEqual(result.affected, moving)
+        self.assertFalse(Book.objects.filter(pk__in=self.book_ids[::2]).exclude(author=author).exists())
+        bulk.edit_titles(self.book_ids[::3], ' ', '_')
+        self.assertFalse(Book.objects.filter(pk__in=self.book_ids[::3], title__contains=' ').exists())
+        deleted = bulk.delete_books(self.book_ids[:900])
+        self.assertEqual(deleted.affected, 900)
+        self.assertDerivedDataExact()
+
+    def test_holdings_are_written_in_bulk_with_one_notification(self):
+        library = Library.objects.order_by('id').first()
+        held = set(library.books.values_list('id', flat=True))
+        notifications = []
+
+        def receiver(action, pk_set, **kwargs):
+            notifications.append((action, pk_set))
+        m2m_changed.connect(receiver, sender=Library.books.through)
+        self.addCleanup(m2m_changed.disconnect, receiver, sender=Library.books.through)
+
+        added = bulk.add_holdings(library, self.book_ids + [0])
+        self.assertEqual(added.affected, len(self.book_ids) - len(held))
+        self.assertEqual(notifications, [('post_add', set(self.book_ids) - held)])
+        self.assertEqual(bulk.add_holdings(library, self.book_ids).affected, 0)
+
+        removed = bulk.remove_holdings(library, self.book_ids[:700])
+        self.assertEqual(removed.affected, 700)
+        self.assertEqual(library.books.count(), len(self.book_ids) - 700)
+        self.assertEqual(len(notifications), 2)
+        self.assertDerivedDataExact()
+
+    def test_collections_compare_and_merge_in_the_database(self):
+        target, first, second, _ = Library.objects.order_by('id')
+        held = {library.pk: set(library.books.values_list('id', flat=True)) for library in (target, first, second)}
+        self.assertEqual(set(branches.holdings_intersection([first, second]).values_list('id', flat=True)),
+                         held[first.pk] & held[second.pk])
+        self.assertEqual(branches.holdings_union([first, second]).count(), len(held[first.pk] | held[second.pk]))
+        self.assertEqual(branches.compare_libraries([first, second]).unique[first.name],
+                         len(held[first.pk] - held[second.pk]))
+
+        moving = held[first.pk] & set(self.book_ids[:100])
+        moved = branches.transfer_holdings(first, target, self.book_ids[:100])
+        self.assertEqual((moved.removed, moved.added), (len(moving), len(moving - held[target.pk])))
+        for library in (target, second):
+            Librarian.objects.update_or_create(library=library, defaults={'name': library.name})
+        # The displaced librarian would be moved to second and deleted with it
+        with self.assertRaisesMessage(ValueError, f'{target.name} would take over {second.name}'):
+            branches.merge_libraries(target, [first, second], librarian=second.librarian, delete_sources=True)
+        self.assertTrue(Library.objects.filter(pk=second.pk).exists())
+        result = branches.merge_libraries(target, [first, second], librarian=second.librarian)
+        self.assertEqual(result.added, len((held[first.pk] | held[second.pk]) - held[target.pk] - moving))
+        self.assertEqual(set(target.books.values_list('id', flat=True)),
+                         held[target.pk] | held[first.pk] | held[second.pk])
+        self.assertEqual((result.librarian, result.displaced_librarian), (second.name, target.name))
+        self.assertEqual(Librarian.objects.get(library=target).name, second.name)
+        self.assertEqual(list(Librarian.objects.filter(name=target.name).values_list('library', flat=True)),
+                         [second.pk])
+        closed = branches.merge_libraries(target, [first, second], delete_sources=True)
+        self.assertEqual(closed.displaced_librarian, '')
+        self.assertFalse(Library.objects.filter(pk__in=[first.pk, second.pk]).exists())
+        # Closing second deleted the librarian who had taken it over
+        self.assertFalse(Librarian.objects.filter(name=target.name).exists())
+        self.assertEqual(CatalogStats.objects.get().total_libraries, Library.objects.count())
+        self.assertDerivedDataExact()
+
+    def test_holdings_endpoint_requires_a_boolean_dry_run(self):
+        library = Library.objects.order_by('id').first()
+        url = reverse('relationship_app:bulk_holdings', args=[library.pk])
+        client = benchmark.client_for_role('admin')
+        held = library.books.count()
+        missing = list(Book.objects.exclude(libraries=library).values_list('id', flat=True)[:5])
+        for dry_run in ('false', 0, None):
+            response = client.post(url, {'action': 'add', 'book_ids': missing, 'dry_run': dry_run},
+                                   content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': '"dry_run" must be true or false'})
+        response = client.post(url, {'action': 'add', 'book_ids': missing, 'dry_run': False},
+                               content_type='application/json')
+        self.assertEqual(response.json()['affected'], len(missing))
+        self.assertEqual(library.books.count(), held + len(missing))
+
+    def test_failed_import_still_refreshes_what_it_wrote(self):
+        records = [{'title': f'Imported {n}', 'author': 'New Author', 'libraries': ['New Branch']} for n in range(3)]
+        lines = [json.dumps(record) for record in records] + ['["not", "an", "object"]']
+        with tempfile.TemporaryDirectory() as scratch:
+            path = Path(scratch) / 'catalog.jsonl'
+            path.write_text('\n'.join(lines), encoding='utf-8')
+            with self.assertRaisesMessage(CommandError, 'Record 4: expected an object'):
+                call_command('import_catalog', str(path), batch_size=2, stdout=StringIO())
+            path.write_text(json.dumps({'title': 'Odd', 'author': 'New Author', 'libraries': 7}), encoding='utf-8')
+            with self.assertRaisesMessage(CommandError, '"libraries" must be a list'):
+                call_command('import_catalog', str(path), stdout=StringIO())
+        # The first batch of two committed before the bad record was read
+        self.assertEqual(Book.objects.filter(title__startswith='Imported').count(), 2)
+        self.assertEqual(Library.objects.get(name='New Branch').book_count, 2)
+        self.assertDerivedDataExact()
+
+
+class IndexAdvisorTests(CatalogTestCase):
+    """The advisor flags unindexed plans, and the shipped indexes clear the ones it proposed"""
+
+    DATASET = dict(books=300, authors=50, libraries=5)
+
+    def test_plans_are_flagged_and_proposed_indexes_exist(self):
+        findings = index_advisor.advise(index_advisor.capture_statements())
+        by_table = {}
+        for finding in findings:
+            by_table.setdefault(finding.table, []).append(finding)
+        book_search = [finding for finding in by_table[Book._meta.db_table] if 'LIKE' in finding.suggestion]
+        self.assertEqual(book_search[0].sources, [f'/admin/relationship_app/book/?q={index_advisor.SEARCH_TERM} (admin)'])
+        suggestions = [finding.suggestion for finding in findings]
+        for proposed in ("Book: models.Index(fields=['title', '-id'])",
+                         "Author: models.Index(fields=['name', '-id'])",
+                         "UserProfile: models.Index(fields=['role'])"):
+            self.assertFalse([suggestion for suggestion in suggestions if proposed in suggestion])
+
+
+class SQLiteProfileTests(CatalogTestCase):
+    """New connections get the production pragmas, and maintenance keeps statistics"""
+
+    def test_connections_are_tuned_and_statistics_refreshed(self):
+        applied = sqlite_profile.current_pragmas(connection.connection)
+        for name in ('busy_timeout', 'cache_size'):
+            self.assertEqual(applied[name], sqlite_profile.DEFAULT_PRAGMAS[name])
+        self.assertEqual(applied['temp_store'], 2)
+        out = StringIO()
+        call_command('optimize_database', stdout=out)
+        call_command('optimize_database', stdout=out)
+        self.assertEqual([line.split(':')[0] for line in out.getvalue().splitlines()],
+                         ['ANALYZE', 'PRAGMA optimize'])
+
+    def test_connecting_leaves_the_journal_mode_alone(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            path = Path(scratch) / 'scratch.sqlite3'
+            scratch_db = DatabaseWrapper({**connection.settings_dict, 'NAME': str(path)}, alias='scratch')
+            scratch_db.ensure_connection()
+            applied = sqlite_profile.current_pragmas(scratch_db.connection)
+            # FULL: NORMAL is only safe once the database is in WAL mode
+            self.assertEqual((applied['journal_mode'], applied['synchronous']), ('delete', 2))
+            self.assertEqual(sqlite_profile.enable_wal(scratch_db.connection), 'wal')
+            scratch_db.close()
+            scratch_db.ensure_connection()
+            applied = sqlite_profile.current_pragmas(scratch_db.connection)
+            self.assertEqual((applied['journal_mode'], applied['synchronous']), ('wal', 1))
+            scratch_db.close()
+
+    def test_only_write_transactions_take_the_lock_at_begin(self):
+        with tempfile.TemporaryDirectory() as scratch:
+            path = Path(scratch) / 'scratch.sqlite3'
+            connections['scratch'] = DatabaseWrapper({**connection.settings_dict, 'NAME': str(path)}, alias='scratch')
+            self.addCleanup(connections.__delitem__, 'scratch')
+            self.addCleanup(lambda: connections['scratch'].close())
+            other = sqlite3.connect(path, timeout=0, isolation_level=None)
+            self.addCleanup(other.close)
+
+            def other_can_write():
+                try:
+                    other.execute('BEGIN IMMEDIATE')
+                except sqlite3.OperationalError:
+                    return False
+                other.execute('ROLLBACK')
+                return True
+            with transaction.atomic(using='scratch'):
+                self.assertTrue(other_can_write())
+            with sqlite_profile.write_transaction(using='scratch'):
+                self.assertFalse(other_can_write())
+            self.assertTrue(other_can_write())
+            self.assertIsNone(connections['scratch'].transaction_mode)
+
+
+class ApiValidatorTests(CatalogTestCase):
+    """API validators change whenever the JSON they describe does"""
+
+    DATASET = dict(books=50, authors=5, libraries=3)
+
+    def etag(self, url):
+        return self.client.get(url)['ETag']
+
+    def test_library_rename_and_delete_change_book_etags(self):
+        library = Library.objects.order_by('id').first()
+        book = library.books.order_by('id').first()
+        url = reverse('relationship_app:api_book', args=[book.pk])
+        before = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before).status_code, 304)
+        library.name = 'Renamed Branch'
+        library.save()
+        renamed = self.etag(url)
+        self.assertNotEqual(before, renamed)
+        self.assertIn('Renamed Branch', self.client.get(url).content.decode())
+        library.delete()
+        self.assertNotEqual(renamed, self.etag(url))
+
+    def test_tampered_cursors_are_rejected_with_400(self):
+        url = reverse('relationship_app:api_books')
+        for values in (['x'], [None], [10 ** 30], [[1]], []):
+            with self.subTest(values=values):
+                response = self.client.get(url, {'cursor': encode_cursor(values, 'next')})
+                self.assertEqual((response.status_code, response.json()), (400, {'error': 'Invalid cursor'}))
+        first = self.client.get(url, {'per_page': 10}).json()
+        self.assertEqual(len(self.client.get(first['next']).json()['results']), 10)
+
+    def test_collection_etag_tracks_deletions_without_counting(self):
+        url = reverse('relationship_app:api_books')
+        before = self.etag(url)
+        Book.objects.order_by('id').first().delete()
+        self.assertNotEqual(before, self.etag(url))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, HTTP_IF_NONE_MATCH=self.etag(url))
+        self.assertFalse([query for query in ctx.captured_queries if 'COUNT(' in query['sql'].upper()])
+
+
+class MetricsTests(CatalogTestCase):
+    """Concurrent flushes never fail a request, and scrapes are loopback-only by default"""
+
+    def test_concurrent_flushes_leave_one_complete_file(self):
+        registry = metrics.Registry()
+        registry.register(metrics.Counter('hits', 'Hits'))
+        errors = []
+
+        def hammer():
+            try:
+                for _ in range(200):
+                    registry.record('hits', 1)
+            except Exception as exc:
+                errors.append(exc)
+        with tempfile.TemporaryDirectory() as scratch:
+            with override_settings(METRICS_MULTIPROC_DIR=scratch, METRICS_FLUSH_INTERVAL=0):
+                threads = [threading.Thread(target=hammer) for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                registry.flush()
+            self.assertEqual(errors, [])
+            files = list(Path(scratch).iterdir())
+            self.assertEqual([path.suffix for path in files], ['.json'])
+            self.assertEqual(json.loads(files[0].read_text()), {'hits': {'': 1600.0}})
+
+    def test_scrapes_are_loopback_only_by_default(self):
+        url = reverse('relationship_app:metrics')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.7').status_code, 403)
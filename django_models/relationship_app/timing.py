@@ -0,0 +1,94 @@
+"""
+Per-request timing collected by RequestTimingMiddleware.
+
+A RequestTimer is attached to the request as `request.timer` and made the
+current timer for the request's context. One execute wrapper, installed on
+every database connection as it is created, adds each query to the current
+timer; because the timer travels in a ContextVar it is also found from the
+worker threads that async views run their ORM calls in. Template render
+time comes from TimedDjangoTemplates. The middleware turns it into a
+Server-Timing header and one structured log line per request.
+"""
+
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+logger = logging.getLogger('relationship_app.timing')
+
+current_timer = ContextVar('relationship_app_request_timer', default=None)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Connection execute wrapper that reports to the current request's timer, if any"""
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(connection):
+    """Add execute_wrapper to a connection once (called as each connection is created)"""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_ms = 0.0
+        self.db_ms = 0.0
+        self.db_queries = 0
+        self.template_ms = 0.0
+        self._template_depth = 0
+
+    # Database execute wrapper (see connection.execute_wrapper)
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.db_queries += 1
+
+    def template_started(self):
+        self._template_depth += 1
+        return time.perf_counter()
+
+    def template_finished(self, started):
+        self._template_depth -= 1
+        # Only the outermost render counts; nested renders are already inside it
+        if self._template_depth == 0:
+            self.template_ms += (time.perf_counter() - started) * 1000
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        return ', '.join([
+            f'db;dur={self.db_ms:.2f};desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_ms:.2f}',
+            f'view;dur={self.view_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ])
+
+    @staticmethod
+    def url_name(request, default=None):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else default
+
+    def log(self, request, response, total_ms):
+        logger.info(json.dumps({
+            'url_name': self.url_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'view_ms': round(self.view_ms, 2),
+            'db_ms': round(self.db_ms, 2),
+            'db_queries': self.db_queries,
+            'template_ms': round(self.template_ms, 2),
+        }))
@@ -1,8 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
 app_name = 'relationship_app'
 
+# Read-only catalog views and dashboards, async when served over ASGI
+if settings.ASYNC_CATALOG_VIEWS:
+    list_books = async_views.list_books
+    book_detail = async_views.book_detail
+    library_detail = async_views.library_detail
+    library_list = async_views.library_list
+    admin_view = async_views.admin_view
+    librarian_view = async_views.librarian_view
+    member_view = async_views.member_view
+else:
+    list_books = views.list_books
+    book_detail = views.book_detail
+    library_detail = views.LibraryDetailView.as_view()
+    library_list = views.LibraryListView.as_view()
+    admin_view = views.admin_view
+    librarian_view = views.librarian_view
+    member_view = views.member_view
+
 urlpatterns = [
     # Authentication URLs
     path('register/', views.RegisterView.as_view(), name='register'),
@@ -11,9 +30,9 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     
     # Role-based URLs
-    path('admin/dashboard/', views.admin_view, name='admin_dashboard'),
-    path('librarian/dashboard/', views.librarian_view, name='librarian_dashboard'),
-    path('member/dashboard/', views.member_view, name='member_dashboard'),
+    path('admin/dashboard/', admin_view, name='admin_dashboard'),
+    path('librarian/dashboard/', librarian_view, name='librarian_dashboard'),
+    path('member/dashboard/', member_view, name='member_dashboard'),
     
     # Book CRUD URLs with permissions (Function-based views)
     path('books/add/', views.add_book_view, name='add_book'),
@@ -24,14 +43,39 @@ urlpatterns = [
     path('books/create/', views.BookCreateView.as_view(), name='create_book'),
     path('books/<int:pk>/update/', views.BookUpdateView.as_view(), name='update_book'),
     path('books/<int:pk>/delete-cbv/', views.BookDeleteView.as_view(), name='delete_book_cbv'),
+
+    # Bulk book operations (preview, then apply in one transaction)
+    path('books/bulk/edit/', views.bulk_edit_books_view, name='bulk_edit_books'),
+    path('books/bulk/reassign/', views.bulk_reassign_books_view, name='bulk_reassign_books'),
+    path('books/bulk/delete/', views.bulk_delete_books_view, name='bulk_delete_books'),
+    path('library/<int:pk>/holdings/', views.bulk_holdings_view, name='bulk_holdings'),
     
     # Permission check URL
     path('permissions/', views.check_permissions_view, name='check_permissions'),
     
     # Existing URLs
-    path('books/', views.list_books, name='list_books'),
-    path('library/<int:pk>/', views.LibraryDetailView.as_view(), name='library_detail'),
-    path('libraries/', views.LibraryListView.as_view(), name='library_list'),
-    path('book/<int:book_id>/', views.book_detail, name='book_detail'),
-    path('', views.LibraryListView.as_view(), name='home'),
+    path('books/', list_books, name='list_books'),
+    path('library/<int:pk>/', library_detail, name='library_detail'),
+    path('libraries/', library_list, name='library_list'),
+    path('book/<int:book_id>/', book_detail, name='book_detail'),
+
+    # Search URLs
+    path('search/', views.search_view, name='search'),
+    path('api/search/', views.search_api_view, name='search_api'),
+
+    # Read-only JSON catalog API
+    path('api/books/', api.book_list, name='api_books'),
+    path('api/books/<int:book_id>/', api.book_detail, name='api_book'),
+    path('api/authors/', api.author_list, name='api_authors'),
+    path('api/authors/<int:author_id>/', api.author_detail, name='api_author'),
+    path('api/libraries/', api.library_list, name='api_libraries'),
+    path('api/libraries/<int:pk>/', api.library_detail, name='api_library'),
+    path('api/libraries/<int:pk>/holdings/', api.library_holdings, name='api_library_holdings'),
+
+    # Streaming catalog export (?format=csv|jsonl, optional ?library=<id>)
+    path('export/', views.export_catalog_view, name='export_catalog'),
+
+    # Prometheus scrape endpoint
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('', library_list, name='home'),
 ]
\ No newline at end of file
@@ -1,19 +1,33 @@
+import json
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
-from django.contrib.auth.decorators import user_passes_test, login_required, permission_required
+from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
-from django.http import HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden, Http404, JsonResponse
+from django.core.paginator import InvalidPage
 from .models import Author, Book, Library, Librarian, UserProfile
+from .roles import role_for_user, role_required, get_request_role
+from .stats import get_catalog_stats
+from .budgets import query_budget
+from .page_cache import CATALOG_PERMISSIONS, cache_catalog_page
+from .pagination import KeysetPaginator, get_page_size, MAX_PAGE_SIZE
+from . import bulk, metrics, search
+from .export import EXPORT_FORMATS, export_response
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.views.decorators.http import require_POST
 
 # === AUTHENTICATION VIEWS ===
 
 # User Registration View
 class RegisterView(CreateView):
+    query_budget = 2
     form_class = UserCreationForm
     success_url = reverse_lazy('relationship_app:login')
     template_name = 'relationship_app/register.html'
@@ -30,6 +44,7 @@ class RegisterView(CreateView):
         return response
 
 # User Login View
+@query_budget(2)
 def login_view(request):
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
@@ -52,6 +67,7 @@ def login_view(request):
     return render(request, 'relationship_app/login.html', {'form': form})
 
 # User Logout View
+@query_budget(2)
 def logout_view(request):
     logout(request)
     messages.success(request, 'You have been successfully logged out.')
@@ -61,56 +77,40 @@ def logout_view(request):
 
 def is_admin(user):
     """Check if user has admin role"""
-    if user.is_authenticated:
-        try:
-            return user.profile.role == 'admin'
-        except UserProfile.DoesNotExist:
-            # Create profile if it doesn't exist
-            UserProfile.objects.create(user=user, role='member')
-            return False
-    return False
+    return role_for_user(user).is_admin
 
 def is_librarian(user):
     """Check if user has librarian role"""
-    if user.is_authenticated:
-        try:
-            return user.profile.role == 'librarian'
-        except UserProfile.DoesNotExist:
-            UserProfile.objects.create(user=user, role='member')
-            return False
-    return False
+    return role_for_user(user).is_librarian
 
 def is_member(user):
-    """Check if user has member role"""
-    if user.is_authenticated:
-        try:
-            return user.profile.role == 'member'
-        except UserProfile.DoesNotExist:
-            UserProfile.objects.create(user=user, role='member')
-            return True  # Default role is member
-    return False
+    """Check if user has member role (users without a profile default to member)"""
+    return role_for_user(user).is_member
 
 # === ROLE-BASED VIEWS ===
 
+@query_budget(3)
 @login_required(login_url="/login/")
-@user_passes_test(is_admin)
+@role_required('admin')
 def admin_view(request):
     """View accessible only to Admin users"""
+    stats = get_catalog_stats()
     context = {
         'user': request.user,
         'role': 'Admin',
-        'total_users': User.objects.count(),
-        'total_books': Book.objects.count(),
-        'total_libraries': Library.objects.count(),
+        'total_users': stats.total_users,
+        'total_books': stats.total_books,
+        'total_libraries': stats.total_libraries,
     }
     return render(request, 'relationship_app/admin_view.html', context)
 
+@query_budget(4)
 @login_required(login_url="/login/")
-@user_passes_test(is_librarian)
+@role_required('librarian')
 def librarian_view(request):
     """View accessible only to Librarian users"""
     # Get libraries managed by this librarian
-    libraries = Library.objects.filter(librarian__name=request.user.username)
+    libraries = Library.objects.with_listing_stats().filter(librarian__name=request.user.username)
     
     context = {
         'user': request.user,
@@ -120,42 +120,37 @@ def librarian_view(request):
     }
     return render(request, 'relationship_app/librarian_view.html', context)
 
+@query_budget(4)
 @login_required(login_url="/login/")
-@user_passes_test(is_member)
+@role_required('member')
 def member_view(request):
     """View accessible only to Member users"""
+    stats = get_catalog_stats()
     context = {
         'user': request.user,
         'role': 'Member',
-        'available_books': Book.objects.count(),
-        'available_libraries': Library.objects.count(),
-        'recent_books': Book.objects.all()[:5],  # Show 5 most recent books
+        'available_books': stats.total_books,
+        'available_libraries': stats.total_libraries,
+        'recent_books': Book.objects.select_related('author').order_by('-id')[:5],  # Show 5 most recent books
     }
     return render(request, 'relationship_app/member_view.html', context)
 
 # === PROFILE MANAGEMENT VIEW ===
 
+@query_budget(2)
 @login_required(login_url="/login/")
 def profile_view(request):
     """User profile view showing role information"""
-    try:
-        profile = request.user.profile
-    except UserProfile.DoesNotExist:
-        # Create profile if it doesn't exist
-        profile = UserProfile.objects.create(user=request.user, role='member')
-    
+    # The template reads the request role through the user_role context
+    # processor; the profile was joined onto request.user by ProfileBackend
     context = {
         'user': request.user,
-        'profile': profile,
-        'role_display': profile.get_role_display(),
-        'is_admin': profile.is_admin(),
-        'is_librarian': profile.is_librarian(),
-        'is_member': profile.is_member(),
     }
     return render(request, 'relationship_app/profile.html', context)
 
 # === PERMISSION CHECK VIEW (ONLY ONE VERSION!) ===
 
+@query_budget(4)
 @login_required(login_url="/login/")
 def check_permissions_view(request):
     """View to show current user's permissions"""
@@ -188,41 +183,70 @@ def check_permissions_view(request):
 # === EXISTING VIEWS ===
 
 # Function-based view to list all books
+@query_budget(5)
+@cache_catalog_page(permissions=CATALOG_PERMISSIONS)
 def list_books(request):
-    """Function-based view that lists all books in the database"""
-    books = Book.objects.select_related('author').all()
+    """Function-based view that lists all books in the database, one keyset page at a time"""
+    paginator = KeysetPaginator(Book.objects.select_related('author'),
+                                ordering=('title', 'id'), per_page=get_page_size(request))
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidPage:
+        raise Http404('Invalid page cursor')
     context = {
-        'books': books,
+        'books': page.object_list,
+        'page': page,
         'user': request.user
     }
     return render(request, 'relationship_app/list_books.html', context)
 
 # Class-based view to display library details
+@method_decorator(cache_catalog_page(), name='dispatch')
 class LibraryDetailView(DetailView):
     """Class-based view using DetailView to display library details"""
+    query_budget = 4
     model = Library
     template_name = 'relationship_app/library_detail.html'
     context_object_name = 'library'
+    # Librarian joined and counts annotated up front; holdings are paged below
+    queryset = Library.objects.with_listing_stats()
     
     def get_context_data(self, **kwargs):
-        """Add additional context data if needed"""
+        """Add one keyset page of the library's holdings"""
         context = super().get_context_data(**kwargs)
+        holdings = self.object.books.select_related('author')
+        paginator = KeysetPaginator(holdings, ordering=('title', 'id'),
+                                    per_page=get_page_size(self.request))
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidPage:
+            raise Http404('Invalid page cursor')
+        context['books'] = page.object_list
+        context['page'] = page
         return context
 
 # Class-based view to list all libraries
+@method_decorator(cache_catalog_page(), name='dispatch')
 class LibraryListView(ListView):
     """Class-based view to list all libraries"""
+    query_budget = 3
     model = Library
     template_name = 'relationship_app/library_list.html'
     context_object_name = 'libraries'
 
+    def get_queryset(self):
+        """Annotate counts and join the librarian so the page runs in a fixed number of queries"""
+        return Library.objects.with_listing_stats().order_by('name', 'id')
+
 # Function-based view for book details
+@query_budget(4)
+@cache_catalog_page()
 def book_detail(request, book_id):
     """Function-based view to show details of a specific book"""
-    book = get_object_or_404(Book.objects.select_related('author'), id=book_id)
+    book = get_object_or_404(Book.objects.with_library_details(), id=book_id)
     
-    # Get all libraries that have this book
-    libraries = book.libraries.all()
+    # Libraries (and their librarians) holding this book, loaded by the prefetch
+    libraries = book.holding_libraries
     
     context = {
         'book': book,
@@ -231,8 +255,75 @@ def book_detail(request, book_id):
     }
     return render(request, 'relationship_app/book_detail.html', context)
 
+# === SEARCH VIEWS ===
+
+SEARCH_RESULT_LIMIT = 50
+
+@query_budget(4)
+def search_view(request):
+    """Ranked full-text search over book titles and author names"""
+    query = request.GET.get('q', '').strip()
+    results = search.search_books(query, limit=SEARCH_RESULT_LIMIT) if query else []
+    context = {
+        'query': query,
+        'results': results,
+        'user': request.user
+    }
+    return render(request, 'relationship_app/search.html', context)
+
+@query_budget(2)
+def search_api_view(request):
+    """JSON version of search_view"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', SEARCH_RESULT_LIMIT)), MAX_PAGE_SIZE))
+    except ValueError:
+        limit = SEARCH_RESULT_LIMIT
+    results = search.search_books(query, limit=limit) if query else []
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {
+                'id': book.id,
+                'title': book.title,
+                'author': book.author.name,
+                'url': book.get_absolute_url(),
+            }
+            for book in results
+        ],
+    })
+
+# === CATALOG EXPORT ===
+
+@query_budget(2)
+@login_required
+@role_required('admin', 'librarian')
+def export_catalog_view(request):
+    """Stream the whole catalog (or one library's holdings) as CSV or JSONL"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+    library_ids = None
+    if request.GET.get('library'):
+        try:
+            library_ids = [int(request.GET['library'])]
+        except ValueError:
+            raise Http404("Invalid library")
+    return export_response(fmt, library_ids=library_ids)
+
+# === METRICS ===
+
+@query_budget(0)
+def metrics_view(request):
+    """Prometheus text exposition of the metrics registry (all workers)"""
+    allowed = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if allowed is not None and request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden("Metrics are not available from this address.")
+    return HttpResponse(metrics.registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # === BOOK CRUD VIEWS WITH PERMISSIONS ===
 
+@query_budget(5)
 @permission_required("relationship_app.can_add_book", login_url="/login/")
 def add_book_view(request):
     """View to add a new book (requires can_add_book permission)"""
@@ -259,6 +350,7 @@ def add_book_view(request):
     }
     return render(request, 'relationship_app/book_form.html', context)
 
+@query_budget(7)
 @permission_required("relationship_app.can_change_book", login_url="/login/")
 def edit_book_view(request, book_id):
     """View to edit an existing book (requires can_change_book permission)"""
@@ -288,6 +380,7 @@ def edit_book_view(request, book_id):
     }
     return render(request, 'relationship_app/book_form.html', context)
 
+@query_budget(6)
 @permission_required("relationship_app.can_delete_book", login_url="/login/")
 def delete_book_view(request, book_id):
     """View to delete a book (requires can_delete_book permission)"""
@@ -309,6 +402,7 @@ def delete_book_view(request, book_id):
 
 class BookCreateView(LoginRequiredMixin, CreateView):
     """Class-based view for creating books with permission mixin"""
+    query_budget = 6
     model = Book
     fields = ['title', 'author']
     template_name = 'relationship_app/book_form_cbv.html'
@@ -326,6 +420,7 @@ class BookCreateView(LoginRequiredMixin, CreateView):
 
 class BookUpdateView(LoginRequiredMixin, UpdateView):
     """Class-based view for updating books with permission mixin"""
+    query_budget = 7
     model = Book
     fields = ['title', 'author']
     template_name = 'relationship_app/book_form_cbv.html'
@@ -345,6 +440,7 @@ class BookUpdateView(LoginRequiredMixin, UpdateView):
 
 class BookDeleteView(LoginRequiredMixin, DeleteView):
     """Class-based view for deleting books with permission mixin"""
+    query_budget = 6
     model = Book
     template_name = 'relationship_app/book_confirm_delete.html'
     success_url = reverse_lazy('relationship_app:list_books')
@@ -359,3 +455,88 @@ class BookDeleteView(LoginRequiredMixin, DeleteView):
         messages.success(self.request, 'Book deleted successfully!')
         return super().delete(request, *args, **kwargs)
 
+# === BULK BOOK OPERATIONS ===
+
+def _bulk_book_view(request, action, run):
+    """Shared flow: GET shows the form, POST previews (dry run) unless "apply" was pressed"""
+    context = {'action': action, 'form': request.POST}
+    if request.method == 'POST':
+        apply = 'apply' in request.POST
+        try:
+            book_ids = bulk.parse_book_ids(request.POST.get('ids'))
+            if not book_ids:
+                raise ValueError('Enter at least one book id')
+            result = run(book_ids, not apply)
+        except ValueError as e:
+            messages.error(request, str(e))
+        else:
+            context['result'] = result
+            if apply:
+                messages.success(request, result.summary())
+    return render(request, 'relationship_app/book_bulk_form.html', context)
+
+@query_budget(5)
+@permission_required("relationship_app.can_change_book", login_url="/login/")
+def bulk_edit_books_view(request):
+    """Find and replace text in the titles of many books (requires can_change_book permission)"""
+    def run(book_ids, dry_run):
+        return bulk.edit_titles(book_ids, request.POST.get('find', ''), request.POST.get('replace', ''),
+                                dry_run=dry_run)
+    return _bulk_book_view(request, 'Edit', run)
+
+@query_budget(5)
+@permission_required("relationship_app.can_change_book", login_url="/login/")
+def bulk_reassign_books_view(request):
+    """Move many books to one author (requires can_change_book permission)"""
+    def run(book_ids, dry_run):
+        try:
+            author = Author.objects.get(id=int(request.POST.get('author', '')))
+        except (ValueError, Author.DoesNotExist):
+            raise ValueError('Author not found')
+        return bulk.reassign_author(book_ids, author, dry_run=dry_run)
+    return _bulk_book_view(request, 'Reassign', run)
+
+@query_budget(5)
+@permission_required("relationship_app.can_delete_book", login_url="/login/")
+def bulk_delete_books_view(request):
+    """Delete many books at once (requires can_delete_book permission)"""
+    def run(book_ids, dry_run):
+        return bulk.delete_books(book_ids, dry_run=dry_run)
+    return _bulk_book_view(request, 'Delete', run)
+
+@query_budget(4)
+@login_required(login_url="/login/")
+@role_required('admin', 'librarian')
+@require_POST
+def bulk_holdings_view(request, pk):
+    """Add or remove many books in one library's holdings in a single transaction (JSON)
+
+    Body: {"action": "add" or "remove", "book_ids": [...], "dry_run": false}.
+    Librarians may only change the library they run.
+    """
+    libraries = Library.objects.all()
+    if not get_request_role(request).is_admin:
+        libraries = libraries.filter(librarian__name=request.user.username)
+    library = get_object_or_404(libraries, pk=pk)
+    try:
+        payload = json.loads(request.body)
+        if not isinstance(payload, dict):
+            raise ValueError('Expected a JSON object')
+        operation = {'add': bulk.add_holdings, 'remove': bulk.remove_holdings}.get(payload.get('action'))
+        if operation is None:
+            raise ValueError('"action" must be "add" or "remove"')
+        book_ids = payload.get('book_ids') or []
+        if isinstance(book_ids, list):
+            book_ids = ' '.join(str(book_id) for book_id in book_ids)
+        if not isinstance(book_ids, str):
+            raise ValueError('"book_ids" must be a list of book ids')
+        book_ids = bulk.parse_book_ids(book_ids)
+        if not book_ids:
+            raise ValueError('"book_ids" must list at least one book id')
+        dry_run = payload.get('dry_run', False)
+        if not isinstance(dry_run, bool):
+            raise ValueError('"dry_run" must be true or false')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    result = operation(library, book_ids, dry_run=dry_run)
+    return JsonResponse(result.as_dict())
@@ -0,0 +1,134 @@
+"""
+Worker warm-up, run by wsgi.py and asgi.py when the application loads
+(asgi.py runs it in a thread when the server imports it inside its event
+loop, since Django refuses database access there).
+
+Django builds most of its per-process state lazily on the first requests
+that need it: the URL resolver imports every view module, templates are
+compiled into the cached loader, and content types are read from the
+database. warm_up() does that work before the worker accepts traffic, and
+with WARMUP_PREFILL_CACHES it also renders the first anonymous catalog
+pages into the page, fragment and stats caches.
+
+Every step is independent and failures are only logged: a cold cache is
+slower, never broken. Database connections are closed at the end so that
+nothing opened here is shared with forked workers.
+"""
+
+import logging
+import os
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.test import RequestFactory
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+logger = logging.getLogger('relationship_app.warmup')
+
+# First pages rendered into the caches when WARMUP_PREFILL_CACHES is set
+PREFILL_ROUTES = ('list_books', 'library_list', 'home')
+
+
+def _populate(resolver):
+    """Build the reverse lookup tables of resolver and every resolver it includes"""
+    resolver.reverse_dict  # populated on first access
+    count = 0
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += _populate(pattern)
+        elif isinstance(pattern, URLPattern):
+            pattern.lookup_str  # resolves the view's import path once
+            count += 1
+    return count
+
+
+def prime_url_resolver():
+    """Import every URLconf and view module and build the reverse lookup tables"""
+    return _populate(get_resolver())
+
+
+def compile_templates():
+    """Load every relationship_app template through each engine's cached loader"""
+    template_dir = os.path.join(apps.get_app_config('relationship_app').path, 'templates')
+    names = []
+    for root, _, files in os.walk(template_dir):
+        for filename in files:
+            if filename.endswith('.html'):
+                names.append(os.path.relpath(os.path.join(root, filename), template_dir).replace(os.sep, '/'))
+    compiled = 0
+    for engine in engines.all():
+        for name in names:
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as exc:
+                logger.warning('Warm-up could not compile %s: %s', name, exc)
+                continue
+            compiled += 1
+    return compiled
+
+
+def prime_content_types():
+    """Fill the ContentType cache that permission checks and the admin rely on"""
+    return len(ContentType.objects.get_for_models(*apps.get_models()))
+
+
+def prime_versions():
+    """Make sure the cache-version keys exist before concurrent first requests race for them"""
+    from .page_cache import get_catalog_version
+    from .permissions import get_permissions_version
+    get_permissions_version()
+    get_catalog_version()
+    return 2
+
+
+def prefill_caches():
+    """Render the first anonymous catalog pages into the page and fragment caches"""
+    from .stats import get_catalog_stats
+    get_catalog_stats()
+    factory = RequestFactory()
+    resolver = get_resolver()
+    rendered = 0
+    for name in PREFILL_ROUTES:
+        path = reverse(f'relationship_app:{name}')
+        request = factory.get(path)
+        request.user = AnonymousUser()
+        match = resolver.resolve(path)
+        request.resolver_match = match
+        view = match.func
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+        response = view(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        rendered += 1
+    return rendered
+
+
+def warm_up(prefill=None):
+    """Run every warm-up step, logging what each did and how long it took"""
+    if prefill is None:
+        prefill = getattr(settings, 'WARMUP_PREFILL_CACHES', False)
+    steps = [prime_url_resolver, compile_templates, prime_content_types, prime_versions]
+    if prefill:
+        steps.append(prefill_caches)
+
+    started = time.perf_counter()
+    try:
+        for step in steps:
+            step_started = time.perf_counter()
+            try:
+                count = step()
+            except Exception:
+                logger.exception('Warm-up step %s failed', step.__name__)
+                continue
+            logger.info('Warm-up %s: %s in %.1fms', step.__name__, count,
+                        (time.perf_counter() - step_started) * 1000)
+    finally:
+        connections.close_all()
+    logger.info('Warm-up finished in %.1fms', (time.perf_counter() - started) * 1000)